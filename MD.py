@@ -1,97 +1,256 @@
 #!/usr/bin/python
 import numpy as np
-from energy import get_energy
-from force import get_forces, move_vertices
-from transition import T1_transition
+from force import get_tissue_energy_and_forces, move_tissue
+from transition import T1_transition_tissue, T2_transition_tissue
 import sys
 from parameters import get_parameters
 from parser import *
-from plot import plot_network
+from plot import plot_tissue
+from trajectory import TrajectoryWriter
+from observables import ObservableWriter, column_names
+from checkpoint import checkpoint_file, save_checkpoint, load_checkpoint
+from timing import Timers
+import os
 
 
-def molecular_dynamics(vertices, edges, polys, parameters, T, folder):
+# adaptive - choose the time step so that no vertex moves more than
+# max_move * lmin in a step, the step is cut to that bound and grows
+# by 20% when the largest move is under half of it, up to delta_t_max
+# (10 * delta_t by default)
+# adaptive mode is only for passive runs (eta = 0 and xi = 0): the
+# polarity angles are updated once per step whatever its length, both
+# the noise and the alignment to the neighbors, so steps of varying
+# length would change the motility dynamics
+# steps are never rejected, the step is cut before the vertices move,
+# so only the number of steps is counted (no rejected steps)
+# the trajectory is written to folder every `every` steps (0 for none),
+# see trajectory.py
+# plot - also plot a frame every delta_t of simulated time
+# (at most one per step)
+# verbose - print time and force norm every step
+# checkpoint - save the full state to folder/checkpoint.pkl every N
+# steps (0 for never), see checkpoint.py
+# resume - continue from folder/checkpoint.pkl if it exists, tissue
+# is overwritten with the saved state
+# profile - time every phase of the loop and count force evaluations
+# and T1 candidates, written to folder/timing.csv (per step) and
+# folder/timing.txt (summary), see timing.py
+# observers - list of observers, their columns are written to
+# folder/observables every observe_every steps, see observables.py
+# (on resume the observers of the checkpoint continue, observers and
+# observe_every must match them)
+# triangles smaller than tissue.amin are extruded (T2) after the T1
+# transitions of every step
+# returns dict with the number of steps and of T1 and T2 transitions
+def molecular_dynamics(tissue, T, folder, adaptive=False, max_move=0.25, delta_t_max=None,
+	every=1, plot=False, verbose=True, checkpoint=0, resume=False, profile=False,
+	observers=None, observe_every=1):
 
-	delta_t = parameters['delta_t']
-	lx = parameters['lx']
-	ly = parameters['ly']
-	L = np.array([lx,ly])
+	if adaptive and (tissue.eta > 0 or tissue.xi > 0):
+		raise ValueError("adaptive time steps require a passive tissue (eta = 0, xi = 0)")
+
+	timers = Timers(profile)
+
+	delta_t = tissue.delta_t
+	if delta_t_max is None:
+		delta_t_max = 10. * delta_t
+	limit = max_move * tissue.lmin
+	dt = delta_t
 
 	# time
 	t = 0
 	count = 0
+	t_plot = 0
+	accepted = 0
+	n_T1 = 0
+	n_T2 = 0
+
+	trajectory = None
+	if every > 0:
+		trajectory = TrajectoryWriter(folder, tissue.L, every)
+
+	# a resumed run keeps the observers of its checkpoint, which must
+	# have the same columns as the ones requested
+	observables = None
+	file = checkpoint_file(folder)
+	resuming = resume and os.path.exists(file)
+	if observers and not resuming:
+		observables = ObservableWriter(os.path.join(folder, "observables"), observers, observe_every)
+
+	if resuming:
+		saved, state, trajectory = load_checkpoint(file)
+		tissue.__dict__.update(saved.__dict__)
+		t = state['t']
+		count = state['count']
+		t_plot = state['t_plot']
+		dt = state['dt']
+		accepted = state['accepted']
+		n_T1 = state['T1']
+		n_T2 = state.get('T2', 0)
+		observables = state.get('observables')
+		saved = (observables.names, observables.every) if observables is not None else None
+		requested = (column_names(observers), observe_every) if observers else None
+		if saved != requested:
+			raise ValueError("observers or observe_every differ from the checkpoint")
+	elif trajectory is not None:
+		trajectory.write(tissue, count, t)
 
 	while t < T:
 
-		# get energy for network
-		energy = get_energy(vertices, polys, edges, parameters)
-		# print energy		
-		
-		# get forces for network
-		forces = get_forces(vertices, polys, edges, parameters)
-		print t, np.sum(forces**2)**(0.5)
+		# get energy and forces for network in a single pass
+		measured = {}
+		with timers.phase("energy_forces"):
+			energy, forces, terms = get_tissue_energy_and_forces(tissue, measured)
+		timers.count("force_evals")
+
+		# observables of the configuration at the start of the step
+		if observables is not None:
+			measured['energy'] = energy
+			measured['terms'] = terms
+			with timers.phase("observables"):
+				observables.observe(tissue, count, t, measured)
+		# print energy
+		if verbose:
+			print t, np.sum(forces**2)**(0.5)
+
+		if adaptive:
+			# largest vertex move with the current step
+			largest = np.max(np.sqrt(np.sum(forces**2, axis=1)))
+			if dt * largest > limit:
+				dt = limit / largest
 
 		# move vertices
-		vertices = move_vertices(vertices, forces, parameters)
+		with timers.phase("move"):
+			move_tissue(tissue, forces, dt)
+		accepted += 1
 
 		# check for T1 transitions
-		polys, edges = T1_transition(vertices, polys, edges, parameters)
+		with timers.phase("T1"):
+			n_T1 += T1_transition_tissue(tissue, batched=True, timers=timers)
+
+		# extrude small triangles
+		if tissue.amin > 0:
+			with timers.phase("T2"):
+				n, keep_vertices, keep_cells = T2_transition_tissue(tissue, timers)
+			n_T2 += n
+			if n > 0 and observables is not None:
+				observables.compact(keep_vertices, keep_cells)
 
-		# add routine to write vertices, energy, forces at every time step
-		# can be used for plotting routines later...
-		# write_vertices(vertices, "%s/%.2f.txt" % (folder,t))
-		# write edges?
-		# write polygons?
-		# if count % 21 == 0:
-		plot_network(vertices, polys, L, "%s/%.2f.jpg" % (folder,t))
+		if plot and t >= t_plot:
+			with timers.phase("plot"):
+				plot_tissue(tissue, "%s/%.2f.jpg" % (folder,t))
+			while t_plot <= t:
+				t_plot += delta_t
 
 		count += 1
-		t += delta_t
+		t += dt
+
+		# vertices every `every` steps, cells when they changed
+		if trajectory is not None:
+			with timers.phase("trajectory"):
+				trajectory.write(tissue, count, t)
+
+		if adaptive and dt * largest < 0.5 * limit:
+			dt = min(1.2 * dt, delta_t_max)
+
+		if checkpoint > 0 and count % checkpoint == 0:
+			state = {}
+			state['t'] = t
+			state['count'] = count
+			state['t_plot'] = t_plot
+			state['dt'] = dt
+			state['accepted'] = accepted
+			state['T1'] = n_T1
+			state['T2'] = n_T2
+			state['observables'] = observables
+			with timers.phase("checkpoint"):
+				if observables is not None:
+					observables.flush()
+				save_checkpoint(file, tissue, state, trajectory)
+
+		timers.end_step(count, t)
+
+	if trajectory is not None:
+		trajectory.close()
+	if observables is not None:
+		observables.close()
+
+	if profile:
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		timers.write_csv(os.path.join(folder, "timing.csv"))
+		timers.write_summary(os.path.join(folder, "timing.txt"))
+		if verbose:
+			print timers.summary()
+
+	if verbose:
+		print "steps:", accepted, "T1 transitions:", n_T1, "T2 transitions:", n_T2
+
+	stats = {}
+	stats['accepted'] = accepted
+	stats['T1'] = n_T1
+	stats['T2'] = n_T2
+	return stats
 
-	return
 
 
+if __name__ == "__main__":
 
-# command line arguments for data files
-vertex_file = sys.argv[1]
-edge_file = sys.argv[2]
-poly_file = sys.argv[3]
-folder = sys.argv[4]
-eta = float(sys.argv[5])
+	# --resume continues from the checkpoint in folder
+	# --profile writes timing.csv and timing.txt to folder
+	# --seed=N seeds the motility noise (random seed by default)
+	# --amin=A extrudes triangles smaller than A (T2, off by default)
+	resume = "--resume" in sys.argv
+	profile = "--profile" in sys.argv
+	seed = None
+	amin = 0.
+	for arg in sys.argv:
+		if arg.startswith("--seed="):
+			seed = int(arg[len("--seed="):])
+		if arg.startswith("--amin="):
+			amin = float(arg[len("--amin="):])
+	args = [arg for arg in sys.argv if not arg.startswith("--")]
 
+	# command line arguments for data files
+	# (bonds are taken from the cells, no edge file)
+	vertex_file = args[1]
+	poly_file = args[2]
+	folder = args[3]
+	eta = float(args[4])
+	# optional: "adaptive" for adaptive time stepping (passive runs
+	# only, needs eta = 0 and xi = 0 below)
+	adaptive = len(args) > 5 and args[5] == "adaptive"
 
-# Parameters
-# lx = 9 * (2 / (3 * (3**0.5)))**0.5
-# ly = 4 * (2 / (3**0.5))**0.5
-L = np.loadtxt("%s/L" % "data")
-lx = L[0]
-ly = L[1]
 
+	# Parameters
+	# lx = 9 * (2 / (3 * (3**0.5)))**0.5
+	# ly = 4 * (2 / (3**0.5))**0.5
+	L = np.loadtxt("%s/L" % "data")
+	lx = L[0]
+	ly = L[1]
 
-ka = 1.
-A0 = 1. # current preferred area for polygon
-gamma = 0.04 * ka * A0 # hexagonal network
-# gamma = 0.1 * ka * A0 # soft network
-Lambda = 0.12 * ka * (A0**(3/2)) # hexagonal network
-# Lambda = -0.85 * ka * A0**(3/2) # soft network
-lmin = 0.2
-delta_t = 0.05
-# eta = 0.01
-xi = 0.2
 
-# maximum Time
-T = 5.
+	ka = 1.
+	A0 = 1. # current preferred area for polygon
+	gamma = 0.04 * ka * A0 # hexagonal network
+	# gamma = 0.1 * ka * A0 # soft network
+	Lambda = 0.12 * ka * (A0**(3/2)) # hexagonal network
+	# Lambda = -0.85 * ka * A0**(3/2) # soft network
+	lmin = 0.2
+	delta_t = 0.05
+	# eta = 0.01
+	xi = 0.2
 
-# get parameter dictionary
-parameters = get_parameters(lx, ly, ka, gamma, Lambda, eta, xi, lmin, delta_t)
+	# maximum Time
+	T = 5.
 
-# get vertices
-vertices = read_vertices(vertex_file)
+	# steps between checkpoints
+	checkpoint = 100
 
-# get edges
-edges = read_edges(edge_file)
+	# get parameter dictionary
+	parameters = get_parameters(lx, ly, ka, gamma, Lambda, eta, xi, lmin, delta_t, amin)
 
-# get polygons
-poly_indices = read_poly_indices(poly_file)
-polys = build_polygons(poly_indices, A0)
+	# get vertices and cells, edges are taken from the cells
+	tissue = read_tissue(vertex_file, poly_file, parameters, A0, seed)
 
-molecular_dynamics(vertices, edges, polys, parameters, T, folder)
\ No newline at end of file
+	molecular_dynamics(tissue, T, folder, adaptive, checkpoint=checkpoint, resume=resume, profile=profile)
\ No newline at end of file
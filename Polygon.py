@@ -20,14 +20,36 @@ indices - list of indices mapping to vertices
 
 n_sides - 	number of sides in polygon for given cell
 
+clockwise, counter_clockwise - vertex index after / before every
+			vertex of the polygon (position to the right / left
+			in indices, wrapping around)
+			* dicts generated when indices are set
+
 L - length of box
 	* used to compute periodic boundary conditions
 
+Geometry (unwrapped vertices, area, perimeter) is cached per polygon
+and reused as long as the vertex version below has not changed and
+the same vertex array is passed in. The version must be bumped with
+bump_version() whenever vertex positions change; setting indices
+clears the cache of that polygon.
+
 """
 
 
+# version of the vertex configuration
+_version = 0
+
+def bump_version():
+	global _version
+	_version += 1
+
+def get_version():
+	return _version
 
-class Polygon:
+
+
+class Polygon(object):
 
 
 	def __init__(self, id, indices, A0, theta):
@@ -36,42 +58,84 @@ class Polygon:
 		self.A0 = A0
 		self.theta = theta
 
+	@property
+	def indices(self):
+		return self._indices
+
+	@indices.setter
+	def indices(self, indices):
+		self._indices = indices
+		self.set_neighbors()
+		self.clear_cache()
+
+	# cyclic successor / predecessor of every vertex
+	# rebuilt whenever indices change (e.g. after a T1 transition)
+	def set_neighbors(self):
+		indices = list(self._indices)
+		self.clockwise = dict(zip(indices, indices[1:] + indices[:1]))
+		self.counter_clockwise = dict(zip(indices, indices[-1:] + indices[:-1]))
+
+	def clear_cache(self):
+		self._cache_key = None
+		self._poly_array = None
+		self._poly_vertices = None
+		self._area = None
+		self._perim = None
+
+	# reset cache if vertices changed since last computation
+	def check_cache(self, vertices):
+		key = (_version, id(vertices))
+		if key != self._cache_key:
+			self.clear_cache()
+			self._cache_key = key
+
+	# (n_sides,2) array of vertices
+	# with periodic boundaries
+	def get_poly_array(self, vertices, L):
+		self.check_cache(vertices)
+		if self._poly_array is None:
+			self._poly_array = self.unwrap_vertices(vertices, L)
+		return self._poly_array
+
 	# return list of vertices
 	# with periodic boundaries 
 	def get_poly_vertices(self, vertices, L):
-		indices = self.indices
-		nsides = len(indices)
-
-		# array of x,y vertices in counter-clockwise order
-		# moving vertices to maintain periodic boundaries
-		poly_vertices = []
-
-		# align everything to previous vertex
-		x0,y0 = vertices[indices[0]]
-		v0 = np.array((x0,y0))
-		v_last = v0
-
-		for i in indices:
-			x,y = vertices[i]
-			v = np.array((x,y))
-			v_next = v_last + periodic_diff(v, v_last, L)
-			x,y = v_next
-			poly_vertices.append((x,y))
-			v_last = np.array((x,y))
-		return poly_vertices
+		u = self.get_poly_array(vertices, L)
+		if self._poly_vertices is None:
+			self._poly_vertices = [tuple(v) for v in u.tolist()]
+		return self._poly_vertices
+
+	# align every vertex to the previous one, in counter-clockwise order
+	def unwrap_vertices(self, vertices, L):
+		p = vertices[self.indices]
+		u = np.zeros(p.shape)
+		u[0] = p[0]
+		u[1:] = p[0] + np.cumsum(periodic_diff(p[1:], p[:-1], L), axis=0)
+		return u
+
+	# corner tables of a single cell for the batched kernels of geometry.py
+	def corner_tables(self):
+		n = len(self.indices)
+		cell = np.zeros(n).astype(int)
+		next_corner = np.roll(np.arange(n), -1)
+		return cell, next_corner
 
 	def get_area(self, vertices, L):
-		poly_vertices = self.get_poly_vertices(vertices, L)
-		a = area(poly_vertices)
-		return a 
+		u = self.get_poly_array(vertices, L)
+		if self._area is None:
+			cell, next_corner = self.corner_tables()
+			self._area = abs(polygon_areas(u, cell, next_corner, 1)[0])
+		return self._area
 
 	def get_perim(self, vertices, L):
-		poly_vertices = self.get_poly_vertices(vertices, L)
-		p = perimeter(poly_vertices)
-		return p
+		u = self.get_poly_array(vertices, L)
+		if self._perim is None:
+			cell, next_corner = self.corner_tables()
+			self._perim = polygon_perimeters(u, cell, next_corner, 1)[0]
+		return self._perim
 
 	def get_center(self, vertices, L):
-		x,y = center(self.get_poly_vertices(vertices, L))
+		x,y = np.mean(self.get_poly_array(vertices, L), axis=0)
 		return x,y
 
 	def set_indices(self, indices):
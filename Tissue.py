@@ -0,0 +1,98 @@
+#!/usr/bin/python
+import numpy as np
+from halfedge import halfedges_from_lists
+from neighbors import CellGraph
+
+"""
+
+Tissue.py - Class Tissue holding the full state of the network
+as flat arrays
+
+vertices - 	array of (x,y) coordinates for every vertex
+
+cells - 	halfedge.HalfEdges topology of the cells
+			* counter-clockwise order
+			* every bond between two cells is stored once,
+			bonds() replaces the edges read from edges.txt
+
+A0, ka, theta - arrays with one value per cell
+			preferred area, elasticity and polarity angle
+
+L - 		array of box lengths (lx, ly)
+
+wraps - 	(n_vertices,2) int array, number of times every vertex
+			crossed the box, vertices + wraps * L are the unwrapped
+			positions (e.g. for MSD)
+
+gamma, Lambda, eta, xi, lmin, amin, delta_t - scalar parameters,
+			see parameters.py
+
+graph - 	neighbors.CellGraph of the cells
+
+random - 	random number generator of the simulation (motility
+			noise), numpy.random.Generator or RandomState on NumPy
+			versions without it, see random_generator
+
+"""
+
+
+
+class Tissue:
+
+
+	# random - generator from random_generator, a new unseeded one if
+	# not given
+	def __init__(self, vertices, cell_indices, A0, theta, parameters, random=None):
+		self.vertices = np.array(vertices).astype(float)
+		self.cells = halfedges_from_lists(cell_indices)
+		n_cells = self.cells.n_cells
+
+		# per cell parameters
+		self.A0 = np.ones(n_cells) * A0
+		self.ka = np.ones(n_cells) * parameters['ka']
+		self.theta = np.array(theta).astype(float)
+
+		# box
+		self.L = np.array([parameters['lx'], parameters['ly']]).astype(float)
+		self.wraps = np.zeros(self.vertices.shape).astype(int)
+
+		# scalar parameters
+		self.gamma = parameters['gamma']
+		self.Lambda = parameters['Lambda']
+		self.eta = parameters['eta']
+		self.xi = parameters['xi']
+		self.lmin = parameters['lmin']
+		self.amin = parameters.get('amin', 0.)
+		self.delta_t = parameters['delta_t']
+
+		self.graph = CellGraph(cell_indices)
+
+		if random is None:
+			random = random_generator()
+		self.random = random
+
+	def n_vertices(self):
+		return len(self.vertices)
+
+	def n_cells(self):
+		return self.cells.n_cells
+
+	# vertex positions without periodic wrapping
+	def unwrapped_vertices(self):
+		return self.vertices + self.wraps * self.L
+
+	# vertex indices of cell c
+	def get_cell(self, c):
+		return self.cells.get_cell(c)
+
+	# array of (index1, index2) for every bond
+	def bonds(self):
+		return self.cells.bonds()
+
+
+
+# explicitly seeded generator, seed None for a random seed
+def random_generator(seed=None):
+	if hasattr(np.random, "default_rng"):
+		return np.random.default_rng(seed)
+	return np.random.RandomState(seed)
@@ -0,0 +1,165 @@
+#!/usr/bin/python
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from parameters import get_parameters
+from parser import build_tissue, build_polygons
+from lattice import hexagonal_lattice, perturb, cell_edges
+from force import get_forces, get_tissue_energy_and_forces, move_tissue
+from energy import get_energy, get_tissue_energy
+from transition import T1_transition_tissue
+from plot import plot_tissue
+
+"""
+
+benchmark.py - times the kernels of the model on periodic hexagonal
+networks of increasing size
+
+usage: python benchmark.py [output json] [cells,cells,...] [repeats]
+
+Default sizes are 100, 1000, 10000 and 100000 cells. Every network is
+a perturbed hexagonal lattice (see lattice.py) with lmin chosen so
+that T1 transitions occur. Kernels:
+
+forces - 	get_tissue_energy_and_forces
+energy - 	get_tissue_energy
+T1, T1_batch - T1_transition_tissue, sequential and batched
+plot - 		plot_tissue to a png file
+md_step - 	forces, move and batched T1 (one step of MD.py), from
+			the state after a step with T1 transitions, which
+			leaves the neighbor matrix to be rebuilt
+forces_loop, energy_loop - original per-polygon loops of get_forces
+			and get_energy, only up to max_loop_cells cells
+
+The best and mean time of every kernel are written to the json file
+together with the commit, so that files of different commits can be
+compared.
+
+"""
+
+
+# parameters of the soft network
+def benchmark_parameters(L):
+	return get_parameters(L[0], L[1], 1., 0.1, -0.85, 0.5, 0.2, 0.2, 0.05)
+
+
+# lattice of about n_cells cells, nx even and the box about square
+def benchmark_lattice(n_cells, sigma=0.2):
+	nx = max(2, 2 * int(round((n_cells * 3**0.5 / 1.5)**0.5 / 2.)))
+	ny = max(1, int(round(n_cells / float(nx))))
+	vertices, cell_indices, L = hexagonal_lattice(nx, ny)
+	vertices = perturb(vertices, L, sigma)
+	return vertices, cell_indices, L
+
+
+# setup() gives the argument of every call, outside the timing
+# returns best and mean time in seconds
+def time_kernel(setup, kernel, repeats):
+	times = []
+	for r in range(repeats):
+		arg = setup()
+		t0 = time.time()
+		kernel(arg)
+		times.append(time.time() - t0)
+	return min(times), sum(times) / len(times)
+
+
+def md_step(tissue):
+	energy, forces, terms = get_tissue_energy_and_forces(tissue)
+	move_tissue(tissue, forces)
+	T1_transition_tissue(tissue, batched=True)
+	return
+
+
+def benchmark_size(n_cells, repeats, max_loop_cells=100):
+	np.random.seed(0)
+	vertices, cell_indices, L = benchmark_lattice(n_cells)
+	parameters = benchmark_parameters(L)
+	tissue = build_tissue(vertices, cell_indices, parameters, 1., 0)
+	image = os.path.join(tempfile.gettempdir(), "benchmark.png")
+
+	def same():
+		return tissue
+
+	def fresh():
+		return copy.deepcopy(tissue)
+
+	# as after a step with T1 transitions
+	def stepped():
+		t = fresh()
+		t.graph.matrix = None
+		return t
+
+	kernels = []
+	kernels.append(("forces", same, get_tissue_energy_and_forces))
+	kernels.append(("energy", same, get_tissue_energy))
+	kernels.append(("T1", fresh, lambda t: T1_transition_tissue(t)))
+	kernels.append(("T1_batch", fresh, lambda t: T1_transition_tissue(t, batched=True)))
+	kernels.append(("plot", same, lambda t: plot_tissue(t, image)))
+	kernels.append(("md_step", stepped, md_step))
+
+	if len(cell_indices) <= max_loop_cells:
+		polys = build_polygons([list(indices) for indices in cell_indices], 1.)
+		edges = cell_edges(cell_indices)
+		kernels.append(("forces_loop", same, lambda t: get_forces(vertices, polys, edges, parameters)))
+		kernels.append(("energy_loop", same, lambda t: get_energy(vertices, polys, edges, parameters)))
+
+	results = []
+	for name, setup, kernel in kernels:
+		best, mean = time_kernel(setup, kernel, repeats)
+		result = {}
+		result['kernel'] = name
+		result['cells'] = len(cell_indices)
+		result['vertices'] = len(vertices)
+		result['repeats'] = repeats
+		result['best'] = best
+		result['mean'] = mean
+		results.append(result)
+		print "%8d cells %12s %10.6f s" % (len(cell_indices), name, best)
+
+	if os.path.exists(image):
+		os.remove(image)
+	return results
+
+
+def git_commit():
+	try:
+		folder = os.path.dirname(os.path.abspath(__file__))
+		return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=folder).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def run_benchmarks(sizes, repeats, file):
+	report = {}
+	report['commit'] = git_commit()
+	report['date'] = time.strftime("%Y-%m-%d %H:%M:%S")
+	report['python'] = platform.python_version()
+	report['numpy'] = np.__version__
+	report['results'] = []
+	for n_cells in sizes:
+		report['results'].extend(benchmark_size(n_cells, repeats))
+
+	f = open(file, "w")
+	json.dump(report, f, indent=1)
+	f.close()
+	return report
+
+
+
+if __name__ == "__main__":
+	file = sys.argv[1] if len(sys.argv) > 1 else "benchmark.json"
+	sizes = [100, 1000, 10000, 100000]
+	if len(sys.argv) > 2:
+		sizes = [int(n) for n in sys.argv[2].split(",")]
+	repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+	run_benchmarks(sizes, repeats, file)
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+import numpy as np
+import cPickle
+import os
+
+"""
+
+checkpoint.py - saves and restores the full state of a simulation
+
+A checkpoint holds
+
+tissue - 	the Tissue (vertices, box crossings, half-edges, cell
+			parameters and polarity angles, neighbor graph and the
+			random generator of the motility noise)
+
+state - 	dict of loop variables of the simulation (time, step,
+			step counts ...)
+
+trajectory - the trajectory.TrajectoryWriter, flushed first so that
+			the files on disk match the checkpoint
+
+random - 	state of the NumPy random number generator
+
+Restoring all of them continues a run exactly where the checkpoint
+was taken, bit for bit. The file is written to a temporary name and
+renamed, so a run killed while saving keeps the previous checkpoint.
+
+"""
+
+
+def checkpoint_file(folder):
+	return os.path.join(folder, "checkpoint.pkl")
+
+
+def save_checkpoint(file, tissue, state, trajectory=None):
+	folder = os.path.dirname(file)
+	if folder != "" and not os.path.isdir(folder):
+		os.makedirs(folder)
+
+	if trajectory is not None:
+		trajectory.flush()
+
+	data = {}
+	data['tissue'] = tissue
+	data['state'] = state
+	data['trajectory'] = trajectory
+	data['random'] = np.random.get_state()
+
+	tmp = file + ".tmp"
+	f = open(tmp, "wb")
+	cPickle.dump(data, f, cPickle.HIGHEST_PROTOCOL)
+	f.flush()
+	os.fsync(f.fileno())
+	f.close()
+	os.rename(tmp, file)
+	return
+
+
+# restores the random number generator
+# returns tissue, state and trajectory writer
+def load_checkpoint(file):
+	f = open(file, "rb")
+	data = cPickle.load(f)
+	f.close()
+
+	np.random.set_state(data['random'])
+	return data['tissue'], data['state'], data['trajectory']
@@ -2,6 +2,7 @@
 import numpy as np
 from Polygon import Polygon
 from geometry import periodic_diff, euclidean_distance
+from incidence import cell_geometry, edge_vectors
 
 """ 
 
@@ -36,6 +37,21 @@ def get_energy(vertices, polys, edges, parameters):
 	return (e1 + e2 + e3)
 
 
+# energy of a Tissue
+def get_tissue_energy(tissue):
+	areas, perims = cell_geometry(tissue.vertices, tissue.cells, tissue.L)
+	d, lengths = edge_vectors(tissue.vertices, tissue.bonds(), tissue.L)
+
+	e1 = E_elasticity_vec(areas, tissue.A0, tissue.ka)
+	e2 = E_adhesion_vec(lengths, tissue.Lambda)
+	# bonds are stored once, same as double counted edges / 4
+	e2 = e2 / 2.
+
+	e3 = E_contraction_vec(perims, tissue.gamma)
+
+	return (e1 + e2 + e3)
+
+
 
 def E_elasticity(vertices, polys, ka, L):
 	e = 0.
@@ -68,3 +84,18 @@ def E_contraction(vertices, polys, gamma, L):
 	return e
 
 
+
+# Vectorized terms from precomputed geometry
+# areas, perims - arrays with one value per cell
+# lengths - array with one value per edge
+
+def E_elasticity_vec(areas, A0, ka):
+	return np.sum((ka / 2.) * (areas - A0)**2)
+
+
+def E_adhesion_vec(lengths, Lambda):
+	return Lambda * np.sum(lengths)
+
+
+def E_contraction_vec(perims, gamma):
+	return np.sum((gamma / 2.) * perims**2)
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+import numpy as np
+import os
+import sys
+import itertools
+from multiprocessing import Pool, cpu_count
+from parameters import get_parameters
+from parser import read_network, split_cells, build_tissue
+from force import mechanics
+from MD import molecular_dynamics
+from observables import MSDObserver
+
+"""
+
+ensemble.py - runs molecular dynamics over a grid of parameters
+and replica seeds in a process pool
+
+usage: python ensemble.py [vertex file] [poly file] [output folder]
+		[name=value,value,...] ...
+
+Any parameter below can be given as a comma separated list, the grid
+is every combination of the lists. lx and ly default to the L file
+next to the vertex file (written by lattice.py) and to the box of the
+network in data/ if there is none. Other options:
+
+replicas - 	number of runs per parameter set (default 1), seeded
+			seed, seed + 1, ...
+
+processes - number of worker processes (default one per core)
+
+every - 	trajectory is written every N steps (0 for none)
+
+The network is parsed once and handed to every worker when the pool
+starts. Every run writes its trajectory to output folder/run_%04d and
+its msd to output folder/run_%04d/observables and one row of summary
+observables to output folder/results.csv:
+
+energy, force - final energy and norm of the mechanical force
+				(without motility, whose noise would be drawn again)
+shape_index - 	mean P / sqrt(A) over cells
+msd - 			mean squared displacement of vertices
+hexagons - 		fraction of 6-sided cells
+accepted, T1, T2 - step and transition counts
+
+"""
+
+
+# default parameters (hexagonal network of data/)
+defaults = {}
+defaults['lx'] = 9 * (2 / (3 * (3**0.5)))**0.5
+defaults['ly'] = 4 * (2 / (3**0.5))**0.5
+defaults['ka'] = 1.
+defaults['A0'] = 1.
+defaults['gamma'] = 0.04
+defaults['Lambda'] = 0.12
+defaults['eta'] = 0.01
+defaults['xi'] = 0.2
+defaults['lmin'] = 0.2
+defaults['amin'] = 0.
+defaults['delta_t'] = 0.05
+defaults['T'] = 5.
+defaults['seed'] = 0
+
+# columns of the results table after run, replica and the parameters
+observables = ["energy", "force", "shape_index", "msd", "hexagons", "accepted", "T1", "T2"]
+
+
+# network shared by the runs of a worker
+_vertices = None
+_cell_indices = None
+
+def init_worker(vertices, cell_indices):
+	global _vertices, _cell_indices
+	_vertices = vertices
+	_cell_indices = cell_indices
+
+
+# box lengths from the L file next to the vertex file, None if there
+# is none
+def read_box(vertex_file):
+	file = os.path.join(os.path.dirname(vertex_file), "L")
+	if not os.path.exists(file):
+		return None
+	return np.loadtxt(file)
+
+
+# list of (run, replica, parameters) for every combination of the
+# grid values and every replica
+# base - parameters not in the grid, defaults if not given
+def build_runs(grid, replicas, base=None):
+	if base is None:
+		base = defaults
+	names = sorted(grid.keys())
+	runs = []
+	for values in itertools.product(*[grid[name] for name in names]):
+		for replica in range(replicas):
+			p = dict(base)
+			p.update(zip(names, values))
+			p['seed'] = p['seed'] + replica
+			runs.append((len(runs), replica, p))
+	return runs
+
+
+def run(job):
+	run_id, replica, p, out, every = job
+
+	parameters = get_parameters(p['lx'], p['ly'], p['ka'], p['gamma'], p['Lambda'],
+		p['eta'], p['xi'], p['lmin'], p['delta_t'], p['amin'])
+	tissue = build_tissue(_vertices, _cell_indices, parameters, p['A0'], int(p['seed']))
+
+	# msd follows the vertices through T2 transitions
+	msd = MSDObserver()
+	folder = os.path.join(out, "run_%04d" % run_id)
+	stats = molecular_dynamics(tissue, p['T'], folder, every=every, verbose=False,
+		observers=[msd], observe_every=max(every, 1))
+
+	# summary observables of the final configuration
+	geometry = {}
+	terms, gradient = mechanics(tissue.vertices, tissue.cells, tissue.bonds(), tissue.A0, tissue.ka,
+		tissue.gamma, tissue.Lambda, tissue.L, single=True, geometry=geometry)
+	areas = geometry['areas']
+	perims = geometry['perims']
+	result = dict(stats)
+	result['energy'] = terms['elasticity'] + terms['adhesion'] + terms['contraction']
+	result['force'] = np.sum(gradient**2)**(0.5)
+	result['shape_index'] = np.mean(perims / np.sqrt(areas))
+	result['msd'] = msd.observe(tissue, geometry)[0]
+	result['hexagons'] = np.mean(tissue.cells.n_sides == 6)
+
+	return run_id, replica, p, result
+
+
+# grid - dict of parameter name to list of values
+# L - box lengths of the network, default lx and ly if not given
+# returns list of (run, replica, parameters, observables) in run order
+def run_ensemble(vertices, cell_indices, out, grid, replicas=1, processes=None, every=10, L=None):
+	if not os.path.isdir(out):
+		os.makedirs(out)
+	if processes is None:
+		processes = cpu_count()
+
+	base = dict(defaults)
+	if L is not None:
+		base['lx'] = float(L[0])
+		base['ly'] = float(L[1])
+	runs = build_runs(grid, replicas, base)
+	jobs = [(run_id, replica, p, out, every) for run_id, replica, p in runs]
+	names = sorted(defaults.keys())
+
+	f = open(os.path.join(out, "results.csv"), "w")
+	f.write(",".join(["run", "replica"] + names + observables) + "\n")
+
+	results = []
+	pool = Pool(processes, init_worker, (vertices, cell_indices))
+	for run_id, replica, p, result in pool.imap_unordered(run, jobs):
+		row = [run_id, replica] + [p[name] for name in names] + [result[name] for name in observables]
+		f.write(",".join([str(x) for x in row]) + "\n")
+		f.flush()
+		results.append((run_id, replica, p, result))
+	pool.close()
+	pool.join()
+	f.close()
+
+	results.sort(key=lambda r: r[0])
+	return results
+
+
+
+if __name__ == "__main__":
+	vertex_file = sys.argv[1]
+	poly_file = sys.argv[2]
+	out = sys.argv[3]
+
+	grid = {}
+	replicas = 1
+	processes = None
+	every = 10
+	for arg in sys.argv[4:]:
+		name, values = arg.split("=")
+		if name == "replicas":
+			replicas = int(values)
+		elif name == "processes":
+			processes = int(values)
+		elif name == "every":
+			every = int(values)
+		elif name in defaults:
+			grid[name] = [float(x) for x in values.split(",")]
+		else:
+			raise ValueError("unknown parameter %s" % name)
+
+	vertices, n_sides, corners = read_network(vertex_file, poly_file)
+	cell_indices = split_cells(n_sides, corners)
+
+	L = read_box(vertex_file)
+	results = run_ensemble(vertices, cell_indices, out, grid, replicas, processes, every, L)
+	print "%d runs written to %s" % (len(results), os.path.join(out, "results.csv"))
@@ -1,6 +1,9 @@
 #!/usr/bin/python
 import numpy as np
 from geometry import *
+from Polygon import bump_version
+from incidence import cell_geometry, corner_vectors, edge_vectors, scatter_add
+from energy import E_elasticity_vec, E_adhesion_vec, E_contraction_vec
 from math import pi
 import matplotlib.pyplot as plt
 
@@ -16,7 +19,11 @@ date: 1/20/16
 """
 
 
-def get_forces(vertices, polys, edges, parameters):
+# incidence - optional table from incidence.build_incidence(polys)
+# if given, elasticity, adhesion and contraction are computed with
+# the vectorized engine instead of looping over vertices and polys
+# graph - optional neighbors.CellGraph for the motility force
+def get_forces(vertices, polys, edges, parameters, incidence=None, graph=None):
 	# get necessary parameters 
 	lx = parameters['lx']
 	ly = parameters['ly']
@@ -27,89 +34,169 @@ def get_forces(vertices, polys, edges, parameters):
 	eta = parameters['eta']
 	xi = parameters['xi']
 
-	f1 = F_elasticity(vertices, polys, ka, L)
-	f2 = F_adhesion(vertices, edges, Lambda, L)
-	f3 = F_contraction(vertices, polys, gamma, L)
-	f4 = F_motility(vertices, polys, eta, xi)
+	if incidence is None:
+		f1 = F_elasticity(vertices, polys, ka, L)
+		f2 = F_adhesion(vertices, edges, Lambda, L)
+		f3 = F_contraction(vertices, polys, gamma, L)
+		f = f1 + f2 + f3
+	else:
+		A0 = np.array([poly.A0 for poly in polys])
+		terms, f = mechanics(vertices, incidence, edges, A0, ka, gamma, Lambda, L)
+	f4 = F_motility(vertices, polys, eta, xi, graph)
 
-	return -(f1 + f2 + f3 + f4)
+	return -(f + f4)
 
 
-def move_vertices(vertices, forces, parameters):
-	delta_t = parameters['delta_t']
+# Energy and forces from a single pass over the geometry
+# areas, perimeters, corner and edge vectors are computed once
+# and shared by every term
+# returns energy, forces and the energy of every term
+def get_energy_and_forces(vertices, polys, edges, parameters, incidence, graph=None):
 	lx = parameters['lx']
 	ly = parameters['ly']
+	L = np.array([lx,ly])
+	ka = parameters['ka']
+	Lambda = parameters['Lambda']
+	gamma = parameters['gamma']
+	eta = parameters['eta']
+	xi = parameters['xi']
 
-	vertices = vertices + delta_t * forces
-	n_vertices = vertices.shape[0]
+	A0 = np.array([poly.A0 for poly in polys])
 
-	# wrap around periodic boundaries
-	for i in range(0, n_vertices):
-		x = vertices[i,0]
-		y = vertices[i,1]
+	terms, f = mechanics(vertices, incidence, edges, A0, ka, gamma, Lambda, L)
+	energy = terms['elasticity'] + terms['adhesion'] + terms['contraction']
 
-		if x < 0:
-			# wrap around to right
-			vertices[i,0] = x + lx
-			# print x, vertices[i,0]
+	f4 = F_motility(vertices, polys, eta, xi, graph)
+	forces = -(f + f4)
 
-		if x > lx:
-			# wrap around to left
-			vertices[i,0] = x - lx
-			# print x, vertices[i,0]
+	return energy, forces, terms
 
-		if y < 0:
-			# wrap around to top
-			vertices[i,1] = y + ly
-			# print y, vertices[i,1]
 
-		if y > ly:
-			# wrap around to bottom
-			vertices[i,1] = y - ly
-			# print y, vertices[i,1]
+# Same as get_energy_and_forces for a Tissue
+# polarity angles in tissue.theta are updated by the motility force
+# geometry - optional dict, receives areas and perims of the cells
+def get_tissue_energy_and_forces(tissue, geometry=None):
+	terms, f = mechanics(tissue.vertices, tissue.cells, tissue.bonds(), 
+		tissue.A0, tissue.ka, tissue.gamma, tissue.Lambda, tissue.L, single=True,
+		geometry=geometry)
+	energy = terms['elasticity'] + terms['adhesion'] + terms['contraction']
 
+	f4 = F_motility_tissue(tissue)
+	forces = -(f + f4)
 
-	return vertices 
+	return energy, forces, terms
 
 
+def get_tissue_forces(tissue):
+	energy, forces, terms = get_tissue_energy_and_forces(tissue)
+	return forces
 
-def get_clockwise(index, indices, vertices, L):
-	
-	# get position of vertex in list
-	pos = [i for i,x in enumerate(indices) if x == index]
-	pos = pos[0]
-
-	# clockwise is position to right
-	# wrap around to 0 if at end of the list
-	if pos == len(indices) - 1:
-		pos = 0
+
+# Elasticity, adhesion and contraction from shared geometry
+# A0, ka - per cell arrays (or scalars)
+# single - edges hold every bond once (Tissue.bonds) instead of twice
+# geometry - optional dict, receives areas and perims of the cells
+# returns energy of every term and sum of the three forces
+def mechanics(vertices, inc, edges, A0, ka, gamma, Lambda, L, single=False, geometry=None):
+	n_vertices = len(vertices)
+
+	# shared geometry
+	areas, perims = cell_geometry(vertices, inc, L)
+	if geometry is not None:
+		geometry['areas'] = areas
+		geometry['perims'] = perims
+	dc, dcc = corner_vectors(vertices, inc, L)
+	d, lengths = edge_vectors(vertices, edges, L)
+
+	terms = {}
+	terms['elasticity'] = E_elasticity_vec(areas, A0, ka)
+	terms['contraction'] = E_contraction_vec(perims, gamma)
+
+	f1 = F_elasticity_vec(inc, dc, dcc, A0, areas, ka, n_vertices)
+	f3 = F_contraction_vec(inc, dc, dcc, perims, gamma, n_vertices)
+
+	if single:
+		# same energy and force as both directions with the / 4 below
+		terms['adhesion'] = E_adhesion_vec(lengths, Lambda) / 2.
+		f2 = F_adhesion_bonds(edges, d, lengths, Lambda, n_vertices)
+	else:
+		# take into account double counting edges
+		terms['adhesion'] = E_adhesion_vec(lengths, Lambda) / 4.
+		f2 = F_adhesion_vec(edges, d, lengths, Lambda, n_vertices)
+
+	return terms, f1 + f2 + f3
+
+
+# out - optional preallocated (n,2) array for the new positions,
+# may be vertices itself to move in place
+# wraps - optional (n,2) int array of box crossings, see wrap_vertices
+def move_vertices(vertices, forces, parameters, out=None, wraps=None):
+	delta_t = parameters['delta_t']
+	lx = parameters['lx']
+	ly = parameters['ly']
+
+	if out is None:
+		out = vertices + delta_t * forces
+	elif out is vertices:
+		out += delta_t * forces
 	else:
-		pos += 1
+		np.multiply(forces, delta_t, out=out)
+		out += vertices
+	vertices = wrap_vertices(out, lx, ly, wraps)
+
+	# cached polygon geometry is out of date
+	bump_version()
+
+	return vertices 
+
+
+# move tissue vertices in place and count box crossings
+# delta_t - time step, tissue.delta_t if not given
+def move_tissue(tissue, forces, delta_t=None):
+	if delta_t is None:
+		delta_t = tissue.delta_t
+	lx, ly = tissue.L
+	tissue.vertices += delta_t * forces
+	wrap_vertices(tissue.vertices, lx, ly, tissue.wraps)
+	return
+
+
+# wrap around periodic boundaries, in place
+# every coordinate is brought back into [0, lx) x [0, ly) however
+# many box lengths it is away
+# wraps - optional (n,2) int array, number of box lengths every vertex
+# was shifted by is added to it, so that vertices + wraps * L are the
+# unwrapped positions
+def wrap_vertices(vertices, lx, ly, wraps=None):
+	L = np.array([lx, ly])
+	shift = np.floor(vertices / L)
+	vertices -= shift * L
+
+	if wraps is not None:
+		wraps += shift.astype(int)
+
+	return vertices
+
+
+
+# clockwise is position to right in poly.indices
+# looked up in the table of the polygon
+def get_clockwise(index, poly, vertices, L):
 
 	# compute vertex wrt periodic boundaries
 	v0 = vertices[index]
-	v = vertices[indices[pos]]
+	v = vertices[poly.clockwise[index]]
 	vc = v0 + periodic_diff(v, v0, L)
 
 	return vc 
 
 
 
-def get_counter_clockwise(index, indices, vertices, L):
-		
-	# get position of vertex in list
-	pos = [i for i,x in enumerate(indices) if x == index]
-	pos = pos[0]
-	
-	# clockwise is position to left
-	# wrap around to end of list if first value
-	if pos == 0:
-		pos = len(indices) - 1
-	else:
-		pos -= 1
+# counter-clockwise is position to left in poly.indices
+def get_counter_clockwise(index, poly, vertices, L):
 
 	v0 = vertices[index]
-	v = vertices[indices[pos]]
+	v = vertices[poly.counter_clockwise[index]]
 	vcc = v0 + periodic_diff(v, v0, L)
 
 	return vcc
@@ -130,13 +217,13 @@ def F_elasticity(vertices, polys, ka,  L):
 
 			# if this vertex is in current poly
 			# compute force contributed from this poly
-			if i in poly.indices:
+			if i in poly.clockwise:
 
 				# get clockwise vector
-				vc = get_clockwise(i, poly.indices, vertices, L)
+				vc = get_clockwise(i, poly, vertices, L)
 
 				# get counter-clockwise vector
-				vcc = get_counter_clockwise(i, poly.indices, vertices, L)
+				vcc = get_counter_clockwise(i, poly, vertices, L)
 
 				# get the difference vector
 				diff = vc - vcc
@@ -170,14 +257,14 @@ def F_contraction(vertices, polys, gamma, L):
 		# find polys with this vertex
 		for poly in polys:
 
-			if i in poly.indices:
+			if i in poly.clockwise:
 
 				# get clockwise vector
-				vc = get_clockwise(i, poly.indices, vertices, L)
+				vc = get_clockwise(i, poly, vertices, L)
 				uvc = unit_vector(vertex, vc)
 	
 				# get counter-clockwise vector
-				vcc = get_counter_clockwise(i, poly.indices, vertices, L)
+				vcc = get_counter_clockwise(i, poly, vertices, L)
 				uvcc = unit_vector(vcc, vertex)
 
 				# get perimeter for this poly
@@ -204,8 +291,53 @@ def F_adhesion(vertices, edges, Lambda, L):
 
 	return forces
 
+# Vectorized versions of the forces above
+# every (vertex, poly) pair is a corner of the incidence table,
+# contributions are computed per corner and summed onto vertices
+# geometry is passed in so it can be shared with the energy
+
+
+def F_elasticity_vec(inc, dc, dcc, A0, areas, ka, n_vertices):
+	diff = dc - dcc
+
+	# -0.5 * perpendicular of diff
+	f = np.zeros(diff.shape)
+	f[:,0] = -0.5 * diff[:,1]
+	f[:,1] = 0.5 * diff[:,0]
+
+	coeff = ka * (A0 - areas)
+	f *= coeff[inc.cell][:,None]
+
+	return scatter_add(inc.corners, f, n_vertices)
+
+
+def F_contraction_vec(inc, dc, dcc, perims, gamma, n_vertices):
+	uvc = -dc / np.sqrt(np.sum(dc**2, axis=1))[:,None]
+	uvcc = dcc / np.sqrt(np.sum(dcc**2, axis=1))[:,None]
+
+	coeff = gamma * perims
+	f = coeff[inc.cell][:,None] * (uvc - uvcc)
+
+	return scatter_add(inc.corners, f, n_vertices)
+
+
+def F_adhesion_vec(edges, d, lengths, Lambda, n_vertices):
+	uv = -d / lengths[:,None]
+	return scatter_add(edges[:,0], Lambda * uv, n_vertices)
+
+
+# every bond stored once, force on both vertices
+def F_adhesion_bonds(bonds, d, lengths, Lambda, n_vertices):
+	uv = -d / lengths[:,None]
+	index = np.concatenate((bonds[:,0], bonds[:,1]))
+	f = np.concatenate((Lambda * uv, -Lambda * uv))
+	return scatter_add(index, f, n_vertices)
+
+
 # Force to move vertices of polys in particular direction
-def F_motility(vertices, polys, eta, xi):
+# graph - optional neighbors.CellGraph, if given the neighbor average
+# is a single sparse product instead of comparing every pair of polys
+def F_motility(vertices, polys, eta, xi, graph=None):
 
 
 	n_vertices = len(vertices)
@@ -217,15 +349,20 @@ def F_motility(vertices, polys, eta, xi):
 
 	neighbor_count = np.ones(len(polys))
 
-	for i,poly in enumerate(polys):
-		avg_angles[i, :] += angle_2_vector(poly.theta)
-		for j,poly2 in enumerate(polys):
-			if i != j:
-				a = poly.indices
-				b = poly2.indices
-				if any(k in a for k in b) == True:
-					avg_angles[i, :] += angle_2_vector(poly2.theta)
-					neighbor_count[i] += 1
+	if graph is not None:
+		theta = np.array([poly.theta for poly in polys])
+		avg_angles, neighbor_count = graph.polarity_sums(theta)
+
+	else:
+		for i,poly in enumerate(polys):
+			avg_angles[i, :] += angle_2_vector(poly.theta)
+			for j,poly2 in enumerate(polys):
+				if i != j:
+					a = poly.indices
+					b = poly2.indices
+					if any(k in a for k in b) == True:
+						avg_angles[i, :] += angle_2_vector(poly2.theta)
+						neighbor_count[i] += 1
 
 	for i,poly in enumerate(polys):
 
@@ -247,6 +384,38 @@ def F_motility(vertices, polys, eta, xi):
 	return forces
 
 
+# Motility for a Tissue, same as F_motility with the neighbor graph
+# noise for all cells drawn at once from the generator of the tissue
+def F_motility_tissue(tissue):
+	n_vertices = tissue.n_vertices()
+	n_cells = tissue.n_cells()
+	eta = tissue.eta
+	xi = tissue.xi
+
+	avg_angles, neighbor_count = tissue.graph.polarity_sums(tissue.theta, tissue.cells)
+
+	# noise variables
+	n = tissue.random.uniform(-pi, pi, (n_cells, 2))
+
+	# average all of the unit vectors for angles
+	avg = avg_angles / neighbor_count[:,None]
+	direction = avg + eta * n
+
+	# force direction for every vertex in current cell
+	cell_forces = xi * direction
+
+	# theta = avg + eta * noise
+	tissue.theta[:] = np.arctan2(direction[:,1], direction[:,0])
+
+	# add to every corner of every cell
+	cells = tissue.cells
+	return scatter_add(cells.corners, cell_forces[cells.cell], n_vertices)
+
+
+
+
+
+
 
 
 
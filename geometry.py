@@ -158,3 +158,72 @@ def check_counter_clockwise(polygon):
 		return True
 	else:
 		return False
+
+
+
+
+# Batched polygon kernels
+# every cell at once from the full vertex array, cells as flat corner
+# tables: vertex index (corners), cell index (cell) and position of the
+# next corner in the same cell (next_corner) of every corner
+# incidence.Incidence and halfedge.HalfEdges hold these tables,
+# csr_tables builds them from CSR offsets
+
+
+# cell and next corner of every corner of cells in CSR form
+# offsets - start of every cell, length n_cells + 1
+def csr_tables(offsets):
+	offsets = np.asarray(offsets).astype(int)
+	n_sides = np.diff(offsets)
+	cell = np.repeat(np.arange(len(n_sides)), n_sides)
+	next_corner = np.arange(offsets[-1]) + 1
+	next_corner[offsets[1:] - 1] = offsets[:-1]
+	return cell, next_corner
+
+
+# corner positions unwrapped with respect to periodic boundaries
+# every corner is aligned to the anchor vertex of its cell, the same
+# as the unwrapped polygon for cells smaller than half the box
+# anchor - one vertex index per cell
+def unwrap_polygons(vertices, corners, cell, anchor, L):
+	anchors = vertices[anchor][cell]
+	return anchors + periodic_diff(vertices[corners], anchors, L)
+
+
+# signed area of every cell (positive if counter-clockwise)
+# u - unwrapped corner positions
+def polygon_areas(u, cell, next_corner, n_cells):
+	u_next = u[next_corner]
+	cross = u[:,0] * u_next[:,1] - u_next[:,0] * u[:,1]
+	return 0.5 * np.bincount(cell, weights=cross, minlength=n_cells)
+
+
+def polygon_perimeters(u, cell, next_corner, n_cells):
+	lengths = np.sqrt(np.sum((u[next_corner] - u)**2, axis=1))
+	return np.bincount(cell, weights=lengths, minlength=n_cells)
+
+
+# area centroid of every cell, in unwrapped coordinates
+# areas - signed areas from polygon_areas
+def polygon_centroids(u, cell, next_corner, n_cells, areas):
+	u_next = u[next_corner]
+	cross = u[:,0] * u_next[:,1] - u_next[:,0] * u[:,1]
+	centroids = np.zeros((n_cells, 2))
+	for k in range(2):
+		centroids[:,k] = np.bincount(cell, weights=(u[:,k] + u_next[:,k]) * cross, minlength=n_cells)
+	return centroids / (6. * areas[:,None])
+
+
+# unwrapped corners, signed areas, perimeters and centroids of cells
+# in CSR form (offsets, corners), centroids wrapped into the box
+def polygon_geometry(vertices, offsets, corners, L):
+	offsets = np.asarray(offsets).astype(int)
+	corners = np.asarray(corners).astype(int)
+	n_cells = len(offsets) - 1
+	cell, next_corner = csr_tables(offsets)
+
+	u = unwrap_polygons(vertices, corners, cell, corners[offsets[:-1]], L)
+	areas = polygon_areas(u, cell, next_corner, n_cells)
+	perims = polygon_perimeters(u, cell, next_corner, n_cells)
+	centroids = polygon_centroids(u, cell, next_corner, n_cells, areas) % L
+	return u, areas, perims, centroids
@@ -0,0 +1,346 @@
+#!/usr/bin/python
+import numpy as np
+from incidence import Incidence
+
+"""
+
+halfedge.py - half-edge (DCEL) topology of the network
+
+Every cell is a cycle of half-edges in counter-clockwise order.
+Half-edge h goes from vertex origin[h] to origin[next_edge[h]] and
+belongs to cell face[h]. Every bond between two cells is stored as a
+pair of twin half-edges, one per cell, so each bond appears once in
+bonds() instead of twice as in edges.txt.
+
+origin - 	vertex index at the start of every half-edge
+
+twin - 		opposite half-edge (-1 if the bond has a single cell)
+
+next_edge, prev_edge - following / preceding half-edge in the cell
+
+face - 		cell of every half-edge
+
+face_edge - one half-edge of every cell
+
+n_sides - 	number of half-edges (and vertices) of every cell
+
+A half-edge is also the corner of its cell at its origin, so the
+class has the same attributes as incidence.Incidence (corners, cell,
+next_corner, prev_corner, next, prev, anchor) and can be passed to
+the same geometry and force functions.
+
+T1 transition around the bond h = i1 -> i2 (labels of transition.py):
+
+	t = twin[h] 	i2 -> i1, Cell 2
+	h_a = prev[h] 	i4 -> i1, Cell 0
+	h_b = next[h] 	i2 -> i5, Cell 0
+	h_c = prev[t] 	i6 -> i2, Cell 2
+	h_d = next[t] 	i1 -> i3, Cell 2
+	h_e = twin[h_d] i3 -> i1, Cell 1
+	h_f = twin[h_a] i1 -> i4, Cell 1
+	h_g = twin[h_b] i5 -> i2, Cell 3
+	h_h = twin[h_c] i2 -> i6, Cell 3
+
+Both rewirings move h to Cell 1 and t to Cell 3 and relink the same
+half-edges, they only differ in which origins change. All of this is
+a constant number of array writes per transition.
+
+T2 transition of the triangle h0 = a -> b, h1 = b -> c, h2 = c -> a:
+
+	t0 = twin[h0] 	b -> a, Cell 0
+	t1 = twin[h1] 	c -> b, Cell 1
+	t2 = twin[h2] 	a -> c, Cell 2
+
+The triangle and t0, t1, t2 are removed, every neighbor loses one
+side, and b, c are merged into a. Removed half-edges, cells and
+vertices are dropped by compacting every array and renumbering the
+rest with a cumulative sum of what is kept.
+
+"""
+
+
+
+class HalfEdges(object):
+
+
+	# n_sides - number of corners of every cell
+	# corners - vertex indices of all cells, concatenated
+	# (same input as incidence.Incidence)
+	def __init__(self, n_sides, corners):
+		inc = Incidence(n_sides, corners)
+
+		self.n_cells = inc.n_cells
+		self.n_sides = inc.n_sides.copy()
+		self.origin = inc.corners.copy()
+		self.face = inc.cell.copy()
+		self.next_edge = inc.next_corner.copy()
+		self.prev_edge = inc.prev_corner.copy()
+		self.face_edge = inc.offsets[:-1].copy()
+
+		# twin of a -> b is b -> a
+		n = len(self.origin)
+		dest = self.origin[self.next_edge]
+		n_vertices = self.origin.max() + 1 if n > 0 else 0
+		keys = self.origin * n_vertices + dest
+		order = np.argsort(keys)
+		keys = keys[order]
+		twin_keys = dest * n_vertices + self.origin
+		pos = np.minimum(np.searchsorted(keys, twin_keys), max(n - 1, 0))
+		found = keys[pos] == twin_keys
+		self.twin = np.where(found, order[pos], -1)
+
+	# incidence.Incidence names, a half-edge is the corner at its origin
+	@property
+	def corners(self):
+		return self.origin
+
+	@property
+	def cell(self):
+		return self.face
+
+	@property
+	def next_corner(self):
+		return self.next_edge
+
+	@property
+	def prev_corner(self):
+		return self.prev_edge
+
+	@property
+	def next(self):
+		return self.origin[self.next_edge]
+
+	@property
+	def prev(self):
+		return self.origin[self.prev_edge]
+
+	@property
+	def anchor(self):
+		return self.origin[self.face_edge]
+
+	def dest(self, h):
+		return self.origin[self.next_edge[h]]
+
+	# one half-edge for every bond
+	def bond_edges(self):
+		h = np.arange(len(self.origin))
+		return h[(self.twin < 0) | (h < self.twin)]
+
+	# array of (index1, index2) for every bond
+	def bonds(self):
+		h = self.bond_edges()
+		return np.column_stack((self.origin[h], self.dest(h)))
+
+	# vertex indices of cell c in counter-clockwise order
+	def get_cell(self, c):
+		h0 = self.face_edge[c]
+		indices = [self.origin[h0]]
+		h = self.next_edge[h0]
+		while h != h0:
+			indices.append(self.origin[h])
+			h = self.next_edge[h]
+		return np.array(indices)
+
+	# cells in CSR form, walking every cell at the same time
+	def to_incidence(self):
+		n_sides = self.n_sides
+		offsets = np.zeros(self.n_cells + 1).astype(int)
+		offsets[1:] = np.cumsum(n_sides)
+		corners = np.zeros(offsets[-1]).astype(int)
+
+		h = self.face_edge.copy()
+		for s in range(n_sides.max() if self.n_cells > 0 else 0):
+			active = np.where(n_sides > s)[0]
+			corners[offsets[active] + s] = self.origin[h[active]]
+			h = self.next_edge[h]
+		return Incidence(n_sides, corners)
+
+	def cell_list(self):
+		return self.to_incidence().cell_list()
+
+	# half-edges around bonds h for a T1 transition, labels as above
+	# returns (n,10) array of h, t, h_a - h_h and which bonds are valid
+	def T1_edges(self, h):
+		h = np.asarray(h)
+		twin = self.twin
+		t = twin[h]
+		h_a = self.prev_edge[h]
+		h_b = self.next_edge[h]
+		h_c = self.prev_edge[t]
+		h_d = self.next_edge[t]
+		h_e = twin[h_d]
+		h_f = twin[h_a]
+		h_g = twin[h_b]
+		h_h = twin[h_c]
+		edges = np.column_stack((h, t, h_a, h_b, h_c, h_d, h_e, h_f, h_g, h_h))
+
+		# every bond has two cells and i1, i2 have three cells each
+		valid = np.all(edges >= 0, axis=1)
+		valid &= self.next_edge[h_e] == h_f
+		valid &= self.next_edge[h_g] == h_h
+
+		# 4 distinct cells, Cell 0 and Cell 2 keep at least 3 sides
+		cell_ids = self.T1_cells(edges)
+		sorted_ids = np.sort(cell_ids, axis=1)
+		valid &= np.all(sorted_ids[:,1:] != sorted_ids[:,:-1], axis=1)
+		valid &= (self.n_sides[cell_ids[:,0]] > 3) & (self.n_sides[cell_ids[:,2]] > 3)
+
+		return edges, valid
+
+	# (n,4) array of Cell 0 - 3
+	def T1_cells(self, edges):
+		h, t, h_a, h_b, h_c, h_d, h_e, h_f, h_g, h_h = edges.T
+		return np.column_stack((self.face[h], self.face[h_e], self.face[t], self.face[h_g]))
+
+	# (n,6) array of i1 - i6
+	def T1_indices(self, edges):
+		h, t, h_a, h_b, h_c, h_d, h_e, h_f, h_g, h_h = edges.T
+		o = self.origin
+		return np.column_stack((o[h], o[t], o[h_e], o[h_a], o[h_g], o[h_c]))
+
+	# apply T1 transitions, no two of them may share a cell
+	# edges - (n,10) array from T1_edges
+	# left - (n,) boolean, left or right transition
+	def T1_rewire(self, edges, left):
+		h, t, h_a, h_b, h_c, h_d, h_e, h_f, h_g, h_h = edges.T
+		left = np.asarray(left).astype(bool)
+		right = ~left
+		cells = self.T1_cells(edges)
+		i1 = self.origin[h]
+		i2 = self.origin[t]
+
+		# left: i1 - i3, i2 - i5 become i2 - i3, i1 - i5
+		self.origin[h_b[left]] = i1[left]
+		self.origin[h_d[left]] = i2[left]
+		self.origin[h[left]] = i2[left]
+		self.origin[t[left]] = i1[left]
+
+		# right: i1 - i4, i2 - i6 become i2 - i4, i1 - i6
+		self.origin[h_f[right]] = i2[right]
+		self.origin[h_h[right]] = i1[right]
+
+		# h moves to Cell 1, t moves to Cell 3
+		self.face[h] = cells[:,1]
+		self.face[t] = cells[:,3]
+
+		# Cell 0: h_a - h_b
+		self.next_edge[h_a] = h_b
+		self.prev_edge[h_b] = h_a
+		# Cell 1: h_e - h - h_f
+		self.next_edge[h_e] = h
+		self.prev_edge[h] = h_e
+		self.next_edge[h] = h_f
+		self.prev_edge[h_f] = h
+		# Cell 2: h_c - h_d
+		self.next_edge[h_c] = h_d
+		self.prev_edge[h_d] = h_c
+		# Cell 3: h_g - t - h_h
+		self.next_edge[h_g] = t
+		self.prev_edge[t] = h_g
+		self.next_edge[t] = h_h
+		self.prev_edge[h_h] = t
+
+		self.face_edge[cells[:,0]] = h_a
+		self.face_edge[cells[:,2]] = h_c
+
+		self.n_sides[cells[:,0]] -= 1
+		self.n_sides[cells[:,1]] += 1
+		self.n_sides[cells[:,2]] -= 1
+		self.n_sides[cells[:,3]] += 1
+		return
+
+
+	# half-edges of triangles c for a T2 transition, labels as above
+	# returns (n,6) array of h0 - h2, t0 - t2 and which are valid
+	def T2_edges(self, c):
+		c = np.asarray(c)
+		h0 = self.face_edge[c]
+		h1 = self.next_edge[h0]
+		h2 = self.next_edge[h1]
+		edges = np.column_stack((h0, h1, h2, self.twin[h0], self.twin[h1], self.twin[h2]))
+
+		# triangles with a neighbor on every side
+		valid = (self.n_sides[c] == 3) & np.all(edges >= 0, axis=1)
+		h0, h1, h2, t0, t1, t2 = edges.T
+
+		# a, b, c have three cells each
+		valid &= self.twin[self.next_edge[t0]] == self.prev_edge[t2]
+		valid &= self.twin[self.next_edge[t1]] == self.prev_edge[t0]
+		valid &= self.twin[self.next_edge[t2]] == self.prev_edge[t1]
+
+		# 3 distinct neighbors that keep at least 3 sides
+		cell_ids = self.T2_cells(edges)
+		sorted_ids = np.sort(cell_ids, axis=1)
+		valid &= np.all(sorted_ids[:,1:] != sorted_ids[:,:-1], axis=1)
+		valid &= np.all(self.n_sides[cell_ids[:,1:]] > 3, axis=1)
+
+		return edges, valid
+
+	# (n,4) array of the triangle and Cell 0 - 2
+	def T2_cells(self, edges):
+		h0, h1, h2, t0, t1, t2 = edges.T
+		return np.column_stack((self.face[h0], self.face[t0], self.face[t1], self.face[t2]))
+
+	# apply T2 transitions, no two of them may share a cell
+	# edges - (n,6) array from T2_edges
+	# n_vertices - number of vertices before the transitions
+	# returns kept vertices and cells (old indices in new order),
+	# vertex a of every triangle is kept
+	def T2_remove(self, edges, n_vertices):
+		h0, h1, h2, t0, t1, t2 = edges.T
+		cells = self.T2_cells(edges)
+		a = self.origin[h0]
+		b = self.origin[h1]
+		c = self.origin[h2]
+
+		# neighbors skip t0 - t2
+		t = edges[:,3:].ravel()
+		p = self.prev_edge[t]
+		n = self.next_edge[t]
+		self.next_edge[p] = n
+		self.prev_edge[n] = p
+		self.face_edge[self.face[t]] = p
+		self.n_sides[self.face[t]] -= 1
+
+		# merge b, c into a
+		merge = np.arange(n_vertices)
+		merge[b] = a
+		merge[c] = a
+		self.origin = merge[self.origin]
+
+		keep_vertices = np.ones(n_vertices).astype(bool)
+		keep_vertices[b] = False
+		keep_vertices[c] = False
+		keep_edges = np.ones(len(self.origin)).astype(bool)
+		keep_edges[edges.ravel()] = False
+		keep_cells = np.ones(self.n_cells).astype(bool)
+		keep_cells[cells[:,0]] = False
+
+		self.compact(keep_vertices, keep_edges, keep_cells)
+		return np.where(keep_vertices)[0], np.where(keep_cells)[0]
+
+	# drop vertices, half-edges and cells not kept and renumber the
+	# rest, kept half-edges may only refer to kept ones
+	# keep_vertices, keep_edges, keep_cells - boolean masks
+	def compact(self, keep_vertices, keep_edges, keep_cells):
+		vertex_map = np.cumsum(keep_vertices) - 1
+		edge_map = np.cumsum(keep_edges) - 1
+		cell_map = np.cumsum(keep_cells) - 1
+
+		twin = self.twin[keep_edges]
+		self.twin = np.where(twin >= 0, edge_map[twin], -1)
+		self.origin = vertex_map[self.origin[keep_edges]]
+		self.face = cell_map[self.face[keep_edges]]
+		self.next_edge = edge_map[self.next_edge[keep_edges]]
+		self.prev_edge = edge_map[self.prev_edge[keep_edges]]
+		self.face_edge = edge_map[self.face_edge[keep_cells]]
+		self.n_sides = self.n_sides[keep_cells]
+		self.n_cells = len(self.n_sides)
+		return
+
+
+# cell_indices - list of vertex indices for every cell
+def halfedges_from_lists(cell_indices):
+	n_sides = [len(indices) for indices in cell_indices]
+	corners = np.concatenate([np.asarray(indices) for indices in cell_indices])
+	return HalfEdges(n_sides, corners)
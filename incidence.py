@@ -0,0 +1,137 @@
+#!/usr/bin/python
+import numpy as np
+from geometry import periodic_diff, unwrap_polygons, polygon_areas, polygon_perimeters, polygon_centroids
+
+"""
+
+incidence.py - flat vertex-cell incidence table used by the
+vectorized force engine
+
+Every polygon is flattened into a list of corners, stored cell
+after cell and in the same counter-clockwise order as poly.indices
+
+offsets - 	start of every cell in the corner arrays
+			* length n_cells + 1, cell c is offsets[c]:offsets[c+1]
+
+corners - 	vertex index of every corner
+
+cell - 		cell index of every corner
+
+prev, next - vertex index before / after every corner
+			(counter-clockwise, wrapping around the cell)
+
+prev_corner, next_corner - same as prev, next but as positions
+			in the corner arrays
+
+anchor - 	first vertex of every cell, used to unwrap the cell
+
+The table only depends on the topology, so it is built once and
+only needs to be rebuilt when T1 transitions rewire cells
+
+"""
+
+
+class Incidence:
+
+
+	# n_sides - number of corners of every cell
+	# corners - vertex indices of all cells, concatenated
+	def __init__(self, n_sides, corners):
+		n_sides = np.asarray(n_sides).astype(int)
+		corners = np.asarray(corners).astype(int)
+		n_cells = len(n_sides)
+
+		offsets = np.zeros(n_cells + 1).astype(int)
+		offsets[1:] = np.cumsum(n_sides)
+
+		cell = np.repeat(np.arange(n_cells), n_sides)
+
+		# position of the neighboring corners in the same cell
+		pos = np.arange(len(corners))
+		next_corner = pos + 1
+		next_corner[offsets[1:] - 1] = offsets[:-1]
+		prev_corner = pos - 1
+		prev_corner[offsets[:-1]] = offsets[1:] - 1
+
+		self.n_cells = n_cells
+		self.n_sides = n_sides
+		self.offsets = offsets
+		self.corners = corners
+		self.cell = cell
+		self.next_corner = next_corner
+		self.prev_corner = prev_corner
+		self.next = corners[next_corner]
+		self.prev = corners[prev_corner]
+		# first vertex of every cell
+		self.anchor = corners[offsets[:-1]]
+
+	# vertex indices of cell c
+	def get_cell(self, c):
+		return self.corners[self.offsets[c]:self.offsets[c+1]]
+
+	# list of vertex indices for every cell
+	def cell_list(self):
+		return np.split(self.corners, self.offsets[1:-1])
+
+
+# cell_indices - list of vertex indices for every cell
+def incidence_from_lists(cell_indices):
+	n_sides = [len(indices) for indices in cell_indices]
+	if len(cell_indices) > 0:
+		corners = np.concatenate([np.asarray(indices) for indices in cell_indices])
+	else:
+		corners = np.zeros(0)
+	return Incidence(n_sides, corners)
+
+
+def build_incidence(polys):
+	return incidence_from_lists([poly.indices for poly in polys])
+
+
+# corner positions unwrapped with respect to periodic boundaries
+# every corner is aligned to the first vertex of its cell, which is the
+# same as Polygon.get_poly_vertices for cells smaller than half the box
+def unwrap_corners(vertices, inc, L):
+	return unwrap_polygons(vertices, inc.corners, inc.cell, inc.anchor, L)
+
+
+# area and perimeter of every cell
+# signed - keep the sign of the area (positive if counter-clockwise)
+def cell_geometry(vertices, inc, L, signed=False):
+	u = unwrap_corners(vertices, inc, L)
+	areas = polygon_areas(u, inc.cell, inc.next_corner, inc.n_cells)
+	if not signed:
+		areas = np.abs(areas)
+	perims = polygon_perimeters(u, inc.cell, inc.next_corner, inc.n_cells)
+	return areas, perims
+
+
+# area centroid of every cell, wrapped into the box
+def cell_centroids(vertices, inc, L):
+	u = unwrap_corners(vertices, inc, L)
+	areas = polygon_areas(u, inc.cell, inc.next_corner, inc.n_cells)
+	return polygon_centroids(u, inc.cell, inc.next_corner, inc.n_cells, areas) % L
+
+
+# vectors from every corner to its clockwise and counter-clockwise
+# neighbors with respect to periodic boundaries
+def corner_vectors(vertices, inc, L):
+	v0 = vertices[inc.corners]
+	dc = periodic_diff(vertices[inc.next], v0, L)
+	dcc = periodic_diff(vertices[inc.prev], v0, L)
+	return dc, dcc
+
+
+# vector from edge[0] to edge[1] and its length for every edge
+def edge_vectors(vertices, edges, L):
+	d = periodic_diff(vertices[edges[:,1]], vertices[edges[:,0]], L)
+	lengths = np.sqrt(np.sum(d**2, axis=1))
+	return d, lengths
+
+
+# add per-corner (or per-edge) vectors onto their vertices
+def scatter_add(index, values, n_vertices):
+	forces = np.zeros((n_vertices, 2))
+	forces[:,0] = np.bincount(index, weights=values[:,0], minlength=n_vertices)
+	forces[:,1] = np.bincount(index, weights=values[:,1], minlength=n_vertices)
+	return forces
@@ -0,0 +1,111 @@
+#!/usr/bin/python
+import numpy as np
+import os
+import sys
+
+"""
+
+lattice.py - generates periodic hexagonal networks
+
+usage: python lattice.py [folder] [nx] [ny] [sigma] [seed]
+
+nx, ny - 	number of columns (even) and rows of cells
+
+sigma - 	standard deviation of random vertex displacements,
+			relative to the side length (default 0)
+
+Cells are regular flat-topped hexagons of area A0 (= 1), columns
+alternately shifted by half a row so that the box
+
+	lx = 1.5 * a * nx
+	ly = sqrt(3) * a * ny
+
+(a the side length) is periodic. The 6 x 4 lattice has the size and box of
+the network in data/. Files are written in the format of data/ plus
+the box size:
+
+network_vertices.txt - (x,y) of every vertex
+edges.txt - 	(index1, index2) for both directions of every bond
+cell_indices.txt - vertex indices of every cell, counter-clockwise
+L - 			lx ly
+
+"""
+
+
+# returns vertices, list of cell indices and box lengths
+def hexagonal_lattice(nx, ny, A0=1.):
+	if nx % 2 != 0:
+		raise ValueError("nx must be even for a periodic lattice")
+
+	# side length and row height of a hexagon of area A0
+	a = (2. * A0 / (3. * 3**0.5))**0.5
+	h = 3**0.5 * a
+	L = np.array([1.5 * a * nx, h * ny])
+
+	# cell centers, in units of a / 2 and h / 2
+	i, j = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+	i = i.ravel()
+	j = j.ravel()
+	cx = 3 * i
+	cy = 2 * j + i % 2
+
+	# corners counter-clockwise from angle 0, in the same units
+	dx = np.array([2, 1, -1, -2, -1, 1])
+	dy = np.array([0, 1, 1, 0, -1, -1])
+	kx = (cx[:,None] + dx[None,:]) % (3 * nx)
+	ky = (cy[:,None] + dy[None,:]) % (2 * ny)
+
+	# every vertex is shared by 3 cells, number them once
+	keys = (kx * 2 * ny + ky).ravel()
+	unique, corners = np.unique(keys, return_inverse=True)
+	vertices = np.zeros((len(unique), 2))
+	vertices[:,0] = (unique // (2 * ny)) * 0.5 * a
+	vertices[:,1] = (unique % (2 * ny)) * 0.5 * h
+
+	cell_indices = corners.reshape(-1, 6)
+	return vertices, cell_indices, L
+
+
+# random displacement of every vertex, sigma relative to side length
+def perturb(vertices, L, sigma, A0=1.):
+	a = (2. * A0 / (3. * 3**0.5))**0.5
+	vertices = vertices + np.random.normal(0., sigma * a, vertices.shape)
+	return vertices % L
+
+
+# directed edges of every cell side
+def cell_edges(cell_indices):
+	edges = []
+	for indices in cell_indices:
+		for k in range(len(indices)):
+			edges.append((indices[k], indices[(k+1) % len(indices)]))
+	return np.array(edges)
+
+
+def write_network(folder, vertices, cell_indices, L):
+	if not os.path.isdir(folder):
+		os.makedirs(folder)
+	np.savetxt(os.path.join(folder, "network_vertices.txt"), vertices, fmt="%.6f", delimiter="\t")
+	np.savetxt(os.path.join(folder, "edges.txt"), cell_edges(cell_indices), fmt="%d")
+	f = open(os.path.join(folder, "cell_indices.txt"), "w")
+	for indices in cell_indices:
+		f.write("\t".join([str(i) for i in indices]) + "\n")
+	f.close()
+	np.savetxt(os.path.join(folder, "L"), L)
+	return
+
+
+
+if __name__ == "__main__":
+	folder = sys.argv[1]
+	nx = int(sys.argv[2])
+	ny = int(sys.argv[3])
+	sigma = float(sys.argv[4]) if len(sys.argv) > 4 else 0.
+	seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+
+	np.random.seed(seed)
+	vertices, cell_indices, L = hexagonal_lattice(nx, ny)
+	if sigma > 0:
+		vertices = perturb(vertices, L, sigma)
+	write_network(folder, vertices, cell_indices, L)
+	print "%d cells, %d vertices, box %f x %f" % (len(cell_indices), len(vertices), L[0], L[1])
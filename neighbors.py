@@ -0,0 +1,127 @@
+#!/usr/bin/python
+import numpy as np
+from scipy import sparse
+
+"""
+
+neighbors.py - cell neighbor graph used for polarity alignment
+
+Two cells are neighbors if they share at least one vertex.
+The graph is built once from the polygons and only the rows of
+rewired cells are recomputed after a T1 transition.
+
+The sparse matrix used for polarity sums is rebuilt after every
+change. Given the cells as incidence arrays (a Tissue's half-edges)
+it is built without a loop over cells, from the cells x vertices
+incidence matrix B as B B^T > 0.
+
+vertex_cells - 	for every vertex, set of cells containing it
+
+neighbors - 	for every cell, set of neighboring cell ids
+				(not including the cell itself)
+
+"""
+
+
+
+class CellGraph:
+
+
+	# cell_indices - list of vertex indices for every cell
+	def __init__(self, cell_indices):
+		self.n_cells = len(cell_indices)
+		self.vertex_cells = {}
+		self.cell_vertices = [set() for c in range(self.n_cells)]
+		self.neighbors = [set() for c in range(self.n_cells)]
+		self.matrix = None
+
+		for c, indices in enumerate(cell_indices):
+			self.add_cell_vertices(c, indices)
+
+		for c in range(self.n_cells):
+			self.neighbors[c] = self.find_neighbors(c)
+
+	def add_cell_vertices(self, cell, indices):
+		self.cell_vertices[cell] = set(int(i) for i in indices)
+		for i in self.cell_vertices[cell]:
+			self.vertex_cells.setdefault(i, set()).add(cell)
+
+	def remove_cell_vertices(self, cell):
+		for i in self.cell_vertices[cell]:
+			self.vertex_cells[i].discard(cell)
+		self.cell_vertices[cell] = set()
+
+	def find_neighbors(self, cell):
+		nbrs = set()
+		for i in self.cell_vertices[cell]:
+			nbrs |= self.vertex_cells[i]
+		nbrs.discard(cell)
+		return nbrs
+
+	# recompute neighbors of cells whose indices changed
+	# only pairs involving one of these cells can change
+	# cells - dictionary of cell id: new indices
+	def update(self, cells):
+		cell_ids = [int(c) for c in cells]
+		for c in cell_ids:
+			self.remove_cell_vertices(c)
+			self.add_cell_vertices(c, cells[c])
+
+		for c in cell_ids:
+			for j in self.neighbors[c]:
+				self.neighbors[j].discard(c)
+			self.neighbors[c] = self.find_neighbors(c)
+			for j in self.neighbors[c]:
+				self.neighbors[j].add(c)
+
+		# sparse matrix is rebuilt when next needed
+		self.matrix = None
+
+	# sparse (neighbors + self) matrix, rows sum to neighbor count + 1
+	# cells - optional incidence.Incidence or halfedge.HalfEdges of
+	# the same cells, to build the matrix from arrays
+	def get_matrix(self, cells=None):
+		if self.matrix is None and cells is not None:
+			self.matrix = incidence_matrix(cells, self.n_cells)
+			self.counts = np.asarray(self.matrix.sum(axis=1)).ravel()
+		if self.matrix is None:
+			rows = []
+			cols = []
+			for c, nbrs in enumerate(self.neighbors):
+				rows.append(c)
+				cols.append(c)
+				# sorted, so that sums do not depend on set order
+				for j in sorted(nbrs):
+					rows.append(c)
+					cols.append(j)
+			data = np.ones(len(rows))
+			n = self.n_cells
+			self.matrix = sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+			self.counts = np.asarray(self.matrix.sum(axis=1)).ravel()
+		return self.matrix
+
+	# sum of unit polarity vectors over every cell and its neighbors
+	# returns sums and number of cells in every sum
+	def polarity_sums(self, theta, cells=None):
+		A = self.get_matrix(cells)
+		u = np.zeros((len(theta), 2))
+		u[:,0] = np.cos(theta)
+		u[:,1] = np.sin(theta)
+		return A.dot(u), self.counts
+
+
+# (neighbors + self) matrix from the corners of the cells, columns
+# of every row in increasing order as in CellGraph.get_matrix
+def incidence_matrix(cells, n_cells):
+	corners = np.asarray(cells.corners)
+	cell = np.asarray(cells.cell)
+	n_vertices = corners.max() + 1 if len(corners) > 0 else 0
+	B = sparse.csr_matrix((np.ones(len(corners)), (cell, corners)), shape=(n_cells, n_vertices))
+	A = B.dot(B.T).tocsr()
+	A.sort_indices()
+	A.data[:] = 1.
+	return A
+
+
+def build_graph(polys):
+	return CellGraph([poly.indices for poly in polys])
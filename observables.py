@@ -0,0 +1,204 @@
+#!/usr/bin/python
+import numpy as np
+import os
+from force import mechanics
+
+"""
+
+observables.py - observables computed while a simulation runs and
+streamed to a columnar file, without keeping the trajectory
+
+	observers = [EnergyObserver(), MSDObserver(), ShapeObserver(),
+		NeighborObserver()]
+	molecular_dynamics(tissue, T, folder, observers=observers,
+		observe_every=10)
+	columns = read_observables(folder + "/observables")
+
+An observer has a list of column names and observe(tissue, measured)
+returning one value per column. measured is the dict of quantities of
+the current step:
+
+energy, terms - total energy and energy of every term
+areas, perims - area and perimeter of every cell
+
+so that observers reuse the geometry of the force computation instead
+of computing it again (measure() computes them for a lone tissue).
+The row of step n is the configuration at the start of step n, before
+the vertices move.
+
+EnergyObserver - 	energy, elasticity, adhesion, contraction
+MSDObserver - 		msd, mean squared displacement of the vertices
+					from the first observed configuration
+ShapeObserver - 	shape_index, shape_index_std, mean and standard
+					deviation of P / sqrt(A) over cells
+NeighborObserver - 	n3 ... n9, fraction of cells with that many
+					neighbors (the first and last also count cells
+					with fewer and more)
+
+A columnar file is a folder with
+
+columns.txt - 	names of the columns, one per line
+<name>.f8 - 	values of the column, little-endian float64
+
+ObservableWriter always writes step and t first. Rows are kept in
+memory and appended to the column files every buffer_size rows.
+Observers holding per vertex or per cell arrays have a compact method
+called when T2 transitions remove vertices and cells.
+
+"""
+
+
+# quantities observers use, when not taken from a force computation
+# only the mechanical terms, so that the polarity angles and the
+# random generator of the tissue are left alone
+def measure(tissue):
+	measured = {}
+	terms, gradient = mechanics(tissue.vertices, tissue.cells, tissue.bonds(), tissue.A0, tissue.ka,
+		tissue.gamma, tissue.Lambda, tissue.L, single=True, geometry=measured)
+	measured['energy'] = terms['elasticity'] + terms['adhesion'] + terms['contraction']
+	measured['terms'] = terms
+	return measured
+
+
+# step, t and the columns of every observer
+def column_names(observers):
+	names = ["step", "t"]
+	for observer in observers:
+		names.extend(observer.names)
+	return names
+
+
+class EnergyObserver:
+
+	names = ["energy", "elasticity", "adhesion", "contraction"]
+
+	def observe(self, tissue, measured):
+		terms = measured['terms']
+		return [measured['energy'], terms['elasticity'], terms['adhesion'], terms['contraction']]
+
+
+class MSDObserver:
+
+	names = ["msd"]
+
+	def __init__(self):
+		self.start = None
+
+	def observe(self, tissue, measured):
+		unwrapped = tissue.unwrapped_vertices()
+		if self.start is None:
+			self.start = unwrapped.copy()
+		return [np.mean(np.sum((unwrapped - self.start)**2, axis=1))]
+
+	def compact(self, keep_vertices, keep_cells):
+		if self.start is not None:
+			self.start = self.start[keep_vertices]
+
+
+class ShapeObserver:
+
+	names = ["shape_index", "shape_index_std"]
+
+	def observe(self, tissue, measured):
+		p = measured['perims'] / np.sqrt(measured['areas'])
+		return [np.mean(p), np.std(p)]
+
+
+class NeighborObserver:
+
+	def __init__(self, n_min=3, n_max=9):
+		self.n_min = n_min
+		self.n_max = n_max
+		self.names = ["n%d" % n for n in range(n_min, n_max + 1)]
+
+	def observe(self, tissue, measured):
+		n_sides = np.clip(tissue.cells.n_sides, self.n_min, self.n_max) - self.n_min
+		counts = np.bincount(n_sides, minlength=self.n_max - self.n_min + 1)
+		return list(counts / float(len(n_sides)))
+
+
+
+class ObservableWriter:
+
+
+	# folder - created if it does not exist
+	# observers - list of observers, column names must be unique
+	# every - observe every N-th step
+	# buffer_size - rows kept before appending to the files
+	def __init__(self, folder, observers, every=1, buffer_size=100):
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		self.folder = folder
+		self.observers = observers
+		self.every = every
+		self.buffer_size = buffer_size
+
+		self.names = column_names(observers)
+		if len(set(self.names)) != len(self.names):
+			raise ValueError("observer column names are not unique")
+
+		f = open(os.path.join(folder, "columns.txt"), "w")
+		f.write("\n".join(self.names) + "\n")
+		f.close()
+
+		# rows in the files and rows not yet written
+		self.n_rows = 0
+		self.rows = []
+
+	# add a row for tissue at step, time t
+	def observe(self, tissue, step, t, measured):
+		if step % self.every != 0:
+			return
+		row = [step, t]
+		for observer in self.observers:
+			row.extend(observer.observe(tissue, measured))
+		self.rows.append(row)
+
+		if len(self.rows) >= self.buffer_size:
+			self.flush()
+		return
+
+	# append buffered rows to the column files
+	# files are first cut to the rows written, so that a new run
+	# overwrites old files and a run resumed from a checkpoint drops
+	# the rows written after it
+	def flush(self):
+		data = np.array(self.rows, dtype="<f8").reshape(-1, len(self.names))
+		for j, name in enumerate(self.names):
+			f = open(os.path.join(self.folder, name + ".f8"), "ab")
+			f.truncate(8 * self.n_rows)
+			data[:,j].tofile(f)
+			f.close()
+		self.n_rows += len(self.rows)
+		self.rows = []
+		return
+
+	# vertices and cells were removed, keep_vertices and keep_cells
+	# are the old indices of the rest
+	def compact(self, keep_vertices, keep_cells):
+		for observer in self.observers:
+			if hasattr(observer, "compact"):
+				observer.compact(keep_vertices, keep_cells)
+		return
+
+	def close(self):
+		self.flush()
+		return
+
+
+
+# returns dict of column name to array of values
+# columns are cut to the shortest one in case a run stopped while
+# appending
+def read_observables(folder):
+	f = open(os.path.join(folder, "columns.txt"))
+	names = [line.strip() for line in f if line.strip() != ""]
+	f.close()
+
+	columns = {}
+	for name in names:
+		columns[name] = np.fromfile(os.path.join(folder, name + ".f8"), dtype="<f8")
+	n = min([len(values) for values in columns.values()])
+	for name in names:
+		columns[name] = columns[name][:n]
+	return columns
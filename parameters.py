@@ -6,7 +6,7 @@ Builds a parameter dictionary
 
 """
 
-def get_parameters(lx, ly, ka, gamma, Lambda, eta, xi, lmin, delta_t):
+def get_parameters(lx, ly, ka, gamma, Lambda, eta, xi, lmin, delta_t, amin=0.):
 
 	parameters = {}
 	
@@ -34,6 +34,9 @@ def get_parameters(lx, ly, ka, gamma, Lambda, eta, xi, lmin, delta_t):
 	# lmin - minimum bond length between two vertices
 	parameters['lmin'] = lmin
 
+	# amin - area below which triangular cells are extruded (0 for never)
+	parameters['amin'] = amin
+
 	# delta t - time step
 	parameters['delta_t'] = delta_t
 
@@ -1,6 +1,9 @@
 #!/usr/bin/python
 import numpy as np
+import os
 from Polygon import Polygon
+from Tissue import Tissue, random_generator
+from math import pi
 from geometry import rand_angle
 
 """
@@ -11,23 +14,62 @@ parser.py - defines functions to read and write relevant data
 author: Lexi Signoriello
 date: 1/22/16
 
-
+Text files are parsed with vectorized readers, cells straight into
+CSR form (n_sides, corners) as used by incidence.Incidence.
+read_network caches the parsed and validated network in a binary
+file next to the cell file, reloaded as long as the vertex and cell
+files have the same size and modification time.
 
 """
 
 
+# list of vertex indices for every cell
 def read_poly_indices(file):
-	# indices = np.loadtxt(file, dtype=int)
-	indices = []
-	f = open(file)
-	for line in f:
-		poly_indices = []
-		linesplit = line.strip().split("\t")
-		for i in linesplit:
-			poly_indices.append(int(i))
-		indices.append(poly_indices)
+	n_sides, corners = read_cells(file)
+	return [indices.tolist() for indices in split_cells(n_sides, corners)]
+
+
+# bytes of a text file, whitespace and first byte of every token
+def scan_tokens(data):
+	b = np.frombuffer(data, dtype=np.uint8)
+	space = (b == ord(" ")) | (b == ord("\t")) | (b == ord("\n")) | (b == ord("\r"))
+	starts = ~space
+	starts[1:] &= space[:-1]
+	return b, space, starts
+
+
+# np.fromstring stops quietly at the first token it cannot parse
+def check_tokens(file, values, starts):
+	if len(values) != np.sum(starts):
+		raise ValueError("%s: %d of %d numbers parsed" % (file, len(values), np.sum(starts)))
+	return
+
+
+# cells in CSR form, one line per cell
+# returns number of vertices of every cell and all indices concatenated
+def read_cells(file):
+	f = open(file, "rb")
+	data = f.read()
 	f.close()
-	return indices
+	corners = np.fromstring(data, dtype=int, sep=" ")
+
+	# only digits, signs would otherwise be read as part of a number
+	b, space, starts = scan_tokens(data)
+	digit = (b >= ord("0")) & (b <= ord("9"))
+	if np.any(~space & ~digit & (b != ord("-")) & (b != ord("+"))):
+		raise ValueError("%s: vertex indices must be integers" % file)
+	check_tokens(file, corners, starts)
+
+	# count the numbers on every line
+	line = np.cumsum(b == ord("\n"))
+	n_sides = np.bincount(line[starts])
+	n_sides = n_sides[n_sides > 0]
+
+	return n_sides, corners
+
+
+def split_cells(n_sides, corners):
+	return np.split(corners, np.cumsum(n_sides)[:-1])
 
 
 def build_polygons(cell_indices, A0):
@@ -39,9 +81,31 @@ def build_polygons(cell_indices, A0):
 	return polys
 
 
+# seed - seed of the random generator of the tissue, which draws the
+# initial angles and the motility noise
+def build_tissue(vertices, cell_indices, parameters, A0, seed=None):
+	random = random_generator(seed)
+	theta = random.uniform(-pi, pi, len(cell_indices))
+	tissue = Tissue(vertices, cell_indices, A0, theta, parameters, random)
+	return tissue
+
+
+# edges are taken from the cells, no edge file needed
+def read_tissue(vertex_file, poly_file, parameters, A0, seed=None):
+	vertices, n_sides, corners = read_network(vertex_file, poly_file)
+	cell_indices = split_cells(n_sides, corners)
+	return build_tissue(vertices, cell_indices, parameters, A0, seed)
+
+
 def read_vertices(file):
-	vertices = np.loadtxt(file)
-	return vertices
+	f = open(file, "rb")
+	data = f.read()
+	f.close()
+	vertices = np.fromstring(data, dtype=float, sep=" ")
+	check_tokens(file, vertices, scan_tokens(data)[2])
+	if len(vertices) % 2 != 0:
+		raise ValueError("%s: odd number of coordinates" % file)
+	return vertices.reshape(-1, 2)
 
 def write_vertices(vertices, file):
 	np.savetxt(file, vertices)
@@ -50,8 +114,86 @@ def write_vertices(vertices, file):
 # i1 i2
 # indices for edge from v1 to v2
 def read_edges(file):
-	edges = np.loadtxt(file).astype(int)
-	return edges
+	f = open(file, "rb")
+	edges = np.fromstring(f.read(), dtype=int, sep=" ")
+	f.close()
+	return edges.reshape(-1, 2)
+
+
+
+# Compiled network
+
+
+def network_cache_file(poly_file):
+	return poly_file + ".npz"
+
+
+# size and modification time of the source files
+def source_stamp(vertex_file, poly_file):
+	stamp = []
+	for file in (vertex_file, poly_file):
+		st = os.stat(file)
+		stamp.extend((st.st_size, st.st_mtime))
+	return np.array(stamp).astype(float)
+
+
+# vertices and cells in CSR form, from the cache if it is up to date,
+# otherwise parsed, validated and cached
+def read_network(vertex_file, poly_file, cache=True):
+	stamp = source_stamp(vertex_file, poly_file)
+	cache_file = network_cache_file(poly_file)
+
+	if cache and os.path.exists(cache_file):
+		with np.load(cache_file) as data:
+			if np.array_equal(data['stamp'], stamp):
+				return data['vertices'], data['n_sides'], data['corners']
+
+	vertices, n_sides, corners = compile_network(vertex_file, poly_file)
+
+	if cache:
+		# write through a temporary file, never leave a partial cache
+		# (no cache if the folder is not writable)
+		tmp = cache_file + ".tmp"
+		try:
+			f = open(tmp, "wb")
+			np.savez(f, vertices=vertices, n_sides=n_sides, corners=corners, stamp=stamp)
+			f.close()
+			os.rename(tmp, cache_file)
+		except (IOError, OSError):
+			pass
+
+	return vertices, n_sides, corners
+
+
+# parse and validate the network files
+def compile_network(vertex_file, poly_file):
+	vertices = read_vertices(vertex_file)
+	n_sides, corners = read_cells(poly_file)
+	validate_network(vertices, n_sides, corners)
+	return vertices, n_sides, corners
+
+
+# raises ValueError if the cells do not form a valid network
+def validate_network(vertices, n_sides, corners):
+	n_vertices = len(vertices)
+	if np.sum(n_sides) != len(corners):
+		raise ValueError("cell sizes do not add up to the number of indices")
+	if np.any(n_sides < 3):
+		raise ValueError("cell with less than 3 vertices")
+	if np.any(corners < 0) or np.any(corners >= n_vertices):
+		raise ValueError("vertex index out of range")
+
+	# every half-edge (directed side) belongs to a single cell, which
+	# also rules out repeated vertices and inconsistent orientations
+	offsets = np.zeros(len(n_sides) + 1).astype(int)
+	offsets[1:] = np.cumsum(n_sides)
+	pos = np.arange(len(corners))
+	next_corner = pos + 1
+	next_corner[offsets[1:] - 1] = offsets[:-1]
+	keys = corners * n_vertices + corners[next_corner]
+	if len(np.unique(keys)) != len(keys):
+		raise ValueError("half-edge shared by two cells")
+	return
 
 
 
@@ -1,7 +1,9 @@
 import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
 import sys
 from parser import *
 from geometry import periodic_diff
+from incidence import incidence_from_lists, unwrap_corners, cell_geometry
 
 """
 
@@ -25,37 +27,45 @@ options:
 """
 
 
-def plot_network(vertices, polys, L, file):
+# color - None (outlines only), "neighbors", "area" or an array
+# with one value per cell, mapped through cmap
+def plot_network(vertices, polys, L, file, color=None, cmap="viridis"):
+	cell_indices = [poly.indices for poly in polys]
+	plot_cells(vertices, cell_indices, L, file, color, cmap)
+	return
+
+
+def plot_tissue(tissue, file, color=None, cmap="viridis"):
+	plot_incidence(tissue.vertices, tissue.cells.to_incidence(), tissue.L, file, color, cmap)
+	return
+
+
+# cell_indices - list of vertex indices for every cell
+def plot_cells(vertices, cell_indices, L, file, color=None, cmap="viridis"):
+	inc = incidence_from_lists(cell_indices)
+	plot_incidence(vertices, inc, L, file, color, cmap)
+	return
+
+
+# inc - incidence.Incidence of the cells
+def plot_incidence(vertices, inc, L, file, color=None, cmap="viridis"):
 	plt.cla()
 	fig = plt.figure()
 	ax = fig.add_subplot(1,1,1)
-	for x,y in vertices:
-		ax.scatter(x, y, c="m", marker=".", s=50)
-
-	for poly in polys:
-		indices = poly.indices
-		for i,index in enumerate(indices):
-			x1,y1 = vertices[index]
-			if i == len(indices) - 1:
-				x2,y2 = vertices[indices[0]]
-			else:
-				x2,y2 = vertices[indices[i+1]]
-
-			v1 = np.array((x1,y1))
-			v2 = np.array((x2,y2))
-			v2 = v1 + periodic_diff(v2, v1, L)
-			x2,y2 = v2
-			ax.plot([x1,x2], [y1,y2], c="c")
-
-			v2 = np.array((x2,y2))
-			v1 = v2 + periodic_diff(v1, v2, L)
-			x1,y1 = v1
-			ax.plot([x1,x2], [y1,y2], c="c")
-
-
-		# # plot centers
-		# x,y = poly.get_center(vertices, L)
-		# plt.scatter(x,y,color="m", marker="*")
+
+	polygons, cell_ids = periodic_polygons(vertices, inc, L)
+	cells = PolyCollection(polygons, edgecolors="c")
+
+	values = cell_values(vertices, inc, L, color)
+	if values is None:
+		cells.set_facecolor("none")
+	else:
+		cells.set_array(np.asarray(values)[cell_ids])
+		cells.set_cmap(cmap)
+		fig.colorbar(cells, ax=ax)
+	ax.add_collection(cells)
+
+	ax.scatter(vertices[:,0], vertices[:,1], c="m", marker=".", s=50)
 
 	# remove axis ticks
 	ax.axes.get_xaxis().set_ticks([])
@@ -66,6 +76,45 @@ def plot_network(vertices, polys, L, file):
 	plt.close(fig)
 	return
 
+
+# value of every cell for the color options
+def cell_values(vertices, inc, L, color):
+	if color is None:
+		return None
+	if color == "neighbors":
+		# every side of a cell is shared with one neighbor
+		return inc.n_sides
+	if color == "area":
+		areas, perims = cell_geometry(vertices, inc, L)
+		return areas
+	return color
+
+
+# unwrapped polygon of every cell plus the periodic images of cells
+# crossing the box, so that every part inside the box is drawn
+# returns list of (n_sides,2) arrays and the cell of every polygon
+def periodic_polygons(vertices, inc, L):
+	u = unwrap_corners(vertices, inc, L)
+
+	# bounding box of every cell
+	lo = np.zeros((inc.n_cells, 2))
+	hi = np.zeros((inc.n_cells, 2))
+	for k in range(2):
+		lo[:,k] = np.minimum.reduceat(u[:,k], inc.offsets[:-1])
+		hi[:,k] = np.maximum.reduceat(u[:,k], inc.offsets[:-1])
+
+	# images shifted by -1, 0, 1 box lengths that overlap the box
+	shifts = np.array([(sx, sy) for sx in (-1,0,1) for sy in (-1,0,1)]) * L
+	overlap = np.all((lo[:,None,:] + shifts[None,:,:] < L) &
+		(hi[:,None,:] + shifts[None,:,:] > 0), axis=2)
+	cell_ids, shift_ids = np.nonzero(overlap)
+
+	starts = inc.offsets[cell_ids]
+	ends = inc.offsets[cell_ids + 1]
+	polygons = [u[s:e] + shifts[k] for s, e, k in zip(starts, ends, shift_ids)]
+	return polygons, cell_ids
+
+
 def plot_edges(vertices, edges, L):
 	plt.cla()
 	for vertex in vertices:
@@ -1,8 +1,10 @@
 #!/usr/bin/python
 import sys
+import os
 from parameters import get_parameters
 from steepest_descent import steepest_descent
 from parser import *
+from timing import Timers
 
 """
 
@@ -11,10 +13,19 @@ Relaxes current network using a steepest descent method
 
 """
 
+# --profile writes timing.csv and timing.txt to the output folder,
+# see timing.py
+profile = "--profile" in sys.argv
+args = [arg for arg in sys.argv if arg != "--profile"]
+
 # command line arguments for data files
-vertex_file = sys.argv[1]
-edge_file = sys.argv[2]
-poly_file = sys.argv[3]
+# (bonds are taken from the cells, no edge file)
+vertex_file = args[1]
+poly_file = args[2]
+# minimizer, see steepest_descent.py
+method = args[3] if len(args) > 3 else "fire"
+# output folder, the folder of the vertex file by default
+folder = args[4] if len(args) > 4 else os.path.dirname(vertex_file)
 
 
 # Parameters
@@ -29,22 +40,24 @@ Lambda = 0.12 * ka * (A0**(3/2)) # hexagonal network
 lmin = 0.2
 delta_t = 0.05
 eta = 1.
+xi = 0.
 
 
 # get parameter dictionary
-parameters = get_parameters(lx, ly, ka, gamma, Lambda, eta, lmin, delta_t)
-
-# get vertices
-vertices = read_vertices(vertex_file)
+parameters = get_parameters(lx, ly, ka, gamma, Lambda, eta, xi, lmin, delta_t)
 
-# get edges
-edges = read_edges(edge_file)
+# get vertices and cells, edges are taken from the cells
+tissue = read_tissue(vertex_file, poly_file, parameters, A0)
 
-# get polygons
-poly_indices = read_poly_indices(poly_file)
-polys = build_polygons(poly_indices, A0)
+timers = Timers(profile)
+steepest_descent(tissue, method, timers=timers)
 
-steepest_descent(vertices, edges, polys, parameters)
+if profile:
+	if folder != "" and not os.path.isdir(folder):
+		os.makedirs(folder)
+	timers.write_csv(os.path.join(folder, "timing.csv"))
+	timers.write_summary(os.path.join(folder, "timing.txt"))
+	print timers.summary()
 
 
 
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import os
+import sys
+from multiprocessing import Pool, cpu_count
+from trajectory import TrajectoryReader
+from plot import plot_cells
+
+"""
+
+render.py - renders the frames of a saved trajectory
+
+usage: python render.py [trajectory folder] [output folder]
+		[stride] [processes] [format] [color]
+
+stride - 	render every N-th frame (default 1)
+
+processes - number of worker processes (default one per core)
+
+format - 	image format (default png)
+
+color - 	"neighbors" or "area" to color cells, see plot.py
+
+Frames are rendered in parallel, off screen (Agg backend), to
+output folder/%05d.format with the frame number. Images that already
+exist are skipped, so an interrupted render can be resumed by
+running the same command again.
+
+"""
+
+
+# trajectory of the worker process
+_reader = None
+
+def init_worker(folder):
+	global _reader
+	_reader = TrajectoryReader(folder)
+
+
+def render_frame(job):
+	k, file, color = job
+	vertices, cells, t = _reader.get_frame(k)
+
+	# render to a temporary name, an interrupted frame is never
+	# mistaken for a finished one
+	folder, name = os.path.split(file)
+	tmp = os.path.join(folder, ".tmp_" + name)
+	plot_cells(vertices, cells, _reader.L, tmp, color)
+	os.rename(tmp, file)
+	return k
+
+
+# returns the number of frames rendered
+def render(folder, out, stride=1, processes=None, format="png", color=None):
+	if not os.path.isdir(out):
+		os.makedirs(out)
+
+	reader = TrajectoryReader(folder)
+	jobs = []
+	for k in range(0, reader.n_frames(), stride):
+		file = os.path.join(out, "%05d.%s" % (k, format))
+		# resume
+		if not os.path.exists(file):
+			jobs.append((k, file, color))
+	if len(jobs) == 0:
+		return 0
+
+	if processes is None:
+		processes = cpu_count()
+
+	# consecutive frames go to the same worker, so they share
+	# the chunk loaded by its reader
+	chunksize = max(1, len(jobs) // (4 * processes))
+	pool = Pool(processes, init_worker, (folder,))
+	for k in pool.imap_unordered(render_frame, jobs, chunksize):
+		pass
+	pool.close()
+	pool.join()
+
+	return len(jobs)
+
+
+
+if __name__ == "__main__":
+	folder = sys.argv[1]
+	out = sys.argv[2] if len(sys.argv) > 2 else folder
+	stride = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+	processes = int(sys.argv[4]) if len(sys.argv) > 4 else None
+	format = sys.argv[5] if len(sys.argv) > 5 else "png"
+	color = sys.argv[6] if len(sys.argv) > 6 else None
+
+	n = render(folder, out, stride, processes, format, color)
+	print "rendered %d frames" % n
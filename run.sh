@@ -1,20 +1,25 @@
 #!/usr/bin/bash
 
 vertex_file=$1
-edge_file=$2
-poly_file=$3
-folder=$4
-eta=$5
+poly_file=$2
+folder=$3
+eta=$4
 
 
 # Relaxation (steepest descent)
-# python relax.py $vertex_file $edge_file $poly_file 
-# python plot.py $vertex_file $edge_file $poly_file 
+# python relax.py $vertex_file $poly_file fire $folder
+# python plot.py $vertex_file $poly_file 
 
 
 # Molecular Dynamics
-python MD.py $vertex_file $edge_file $poly_file $folder $eta
+python MD.py $vertex_file $poly_file $folder $eta
+
+# Render saved trajectory (in parallel, can run while MD is running)
+# python render.py $folder $folder/frames
+
+# Parameter sweep (grid x replicas in a process pool)
+# python ensemble.py $vertex_file $poly_file $folder eta=0.01,0.1,1 replicas=4
 
 # later, will add division simulations..
-# python divide.py $vertex_file $edge_file $poly_file 
+# python divide.py $vertex_file $poly_file 
 
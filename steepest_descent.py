@@ -1,66 +1,283 @@
 #!/usr/bin/python
 import numpy as np
-from energy import get_energy
-from force import get_forces, move_vertices
-from transition import T1_transition
+from force import get_tissue_energy_and_forces, move_tissue, mechanics, wrap_vertices
+from transition import T1_transition_tissue
+from timing import Timers
 
+"""
 
-def steepest_descent(vertices, edges, polys, parameters):
+steepest_descent.py - relaxes a Tissue to a local energy minimum
 
-	epsilon = 10**-6
-	delta_t = parameters['delta_t']
+method - 	"steepest" fixed delta_t gradient steps
+			"fire" FIRE with adaptive time step
+			"lbfgs" L-BFGS with backtracking line search
+
+All methods stop when the force norm drops below epsilon (or after
+max_steps force evaluations) and check for T1 transitions after every
+step. FIRE and L-BFGS drop their velocity / history when a T1
+transition changes the topology, and never move a vertex by more than
+lmin in a step so that bonds cannot pass through each other.
+
+FIRE and L-BFGS minimize the potential of the mechanical forces,
+motility is not included. Adhesion enters that potential with Lambda
+per bond, twice the adhesion term reported by get_energy, which counts
+every bond as half (see relax_potential).
+
+timers - 	optional timing.Timers, records the time of force
+			evaluations, moves and T1 checks, force evaluations and
+			T1 candidates, one row per step
+
+"""
+
+
+def steepest_descent(tissue, method="steepest", epsilon=10**-6, max_steps=None, timers=None):
+	if timers is None:
+		timers = Timers()
+	if method == "steepest":
+		return relax_steepest(tissue, epsilon, max_steps, timers)
+	if method == "fire":
+		return relax_fire(tissue, epsilon, max_steps, timers)
+	if method == "lbfgs":
+		return relax_lbfgs(tissue, epsilon, max_steps, timers)
+	raise ValueError("unknown method %s" % method)
+
+
+# returns the number of force evaluations
+def relax_steepest(tissue, epsilon, max_steps=None, timers=None):
+	if timers is None:
+		timers = Timers()
+
+	delta_t = tissue.delta_t
 	t = 0.
 
 	count = 0
 	forces = 10**6
 	while np.sum(forces**2)**(0.5) > epsilon:
-
-		# get energy for network
-		energy = get_energy(vertices, polys, edges, parameters)
-		# print energy		
-		
-		# get forces for network
-		forces = get_forces(vertices, polys, edges, parameters)
+		if max_steps is not None and count >= max_steps:
+			break
+
+		# get energy and forces for network in a single pass
+		with timers.phase("energy_forces"):
+			energy, forces, terms = get_tissue_energy_and_forces(tissue)
+		timers.count("force_evals")
+		# print energy
 		print np.sum(forces**2)**(0.5)
+		count += 1
 
 	
 		# move vertices
-		vertices = move_vertices(vertices, forces, parameters)
+		with timers.phase("move"):
+			move_tissue(tissue, forces)
 
 		# check for T1 transitions
-		cells, edges = T1_transition(vertices, polys, edges, parameters)
+		with timers.phase("T1"):
+			T1_transition_tissue(tissue, timers=timers)
 
 		# add routine to write vertices, energy, forces at every time step
 		# can be used for plotting routines later...
 	
 		t += delta_t
+		timers.end_step(count, t)
+
+
+	return count
+
+
+# potential and gradient of the mechanical forces at vertices
+# (-gradient is the force of get_tissue_energy_and_forces without motility)
+def relax_potential(tissue, vertices, timers=None):
+	if timers is None:
+		timers = Timers()
+	with timers.phase("energy_forces"):
+		terms, gradient = mechanics(vertices, tissue.cells, tissue.bonds(), 
+			tissue.A0, tissue.ka, tissue.gamma, tissue.Lambda, tissue.L, single=True)
+	timers.count("force_evals")
+	energy = terms['elasticity'] + 2. * terms['adhesion'] + terms['contraction']
+	return energy, gradient
+
+
+# move tissue vertices by dx, wrapped into the box
+def displace(tissue, dx):
+	lx, ly = tissue.L
+	tissue.vertices += dx
+	wrap_vertices(tissue.vertices, lx, ly, tissue.wraps)
+	return
+
+
+# scale factor so that no vertex moves more than max_move
+def limit_step(dx, max_move):
+	largest = np.max(np.sqrt(np.sum(dx**2, axis=1)))
+	if largest > max_move:
+		return max_move / largest
+	return 1.
+
+
+# FIRE (fast inertial relaxation engine)
+# velocity Verlet-like steps with a velocity mixed towards the force,
+# time step grows while the power F.v stays positive
+# returns the number of force evaluations
+def relax_fire(tissue, epsilon, max_steps=None, timers=None):
+	if timers is None:
+		timers = Timers()
+
+	# FIRE parameters
+	N_min = 5
+	f_inc = 1.1
+	f_dec = 0.5
+	alpha_start = 0.1
+	f_alpha = 0.99
+	delta_t = tissue.delta_t
+	delta_t_max = 10. * delta_t
+	max_move = tissue.lmin
+
+	alpha = alpha_start
+	velocity = np.zeros(tissue.vertices.shape)
+	n_positive = 0
 
+	t = 0.
+	count = 0
+	while max_steps is None or count < max_steps:
+
+		energy, gradient = relax_potential(tissue, tissue.vertices, timers)
+		forces = -gradient
+		count += 1
+		norm = np.sum(forces**2)**(0.5)
+		print norm
+		if norm < epsilon:
+			break
+
+		# mix velocity towards force while moving downhill
+		power = np.sum(forces * velocity)
+		if power > 0:
+			v_norm = np.sum(velocity**2)**(0.5)
+			velocity = (1. - alpha) * velocity + alpha * v_norm * forces / norm
+			n_positive += 1
+			if n_positive > N_min:
+				delta_t = min(delta_t * f_inc, delta_t_max)
+				alpha *= f_alpha
+		else:
+			velocity[:] = 0.
+			delta_t *= f_dec
+			alpha = alpha_start
+			n_positive = 0
+
+		velocity += delta_t * forces
+		dx = delta_t * velocity
+		with timers.phase("move"):
+			displace(tissue, dx * limit_step(dx, max_move))
+		t += delta_t
 
-	return 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+		# restart from rest after a T1 transition
+		with timers.phase("T1"):
+			n_T1 = T1_transition_tissue(tissue, timers=timers)
+		if n_T1 > 0:
+			velocity[:] = 0.
+			alpha = alpha_start
+			n_positive = 0
+
+		timers.end_step(count, t)
+
+	return count
+
+
+# L-BFGS with the two-loop recursion and a backtracking (Armijo)
+# line search, trial positions are wrapped into the box
+# returns the number of force evaluations
+def relax_lbfgs(tissue, epsilon, max_steps=None, timers=None):
+	if timers is None:
+		timers = Timers()
+
+	# number of stored corrections
+	m = 10
+	# sufficient decrease
+	c1 = 10**-4
+	max_move = tissue.lmin
+	lx, ly = tissue.L
+
+	s_list = []
+	y_list = []
+
+	energy, gradient = relax_potential(tissue, tissue.vertices, timers)
+	count = 1
+	step_count = 0
+	while max_steps is None or count < max_steps:
+
+		norm = np.sum(gradient**2)**(0.5)
+		print norm
+		if norm < epsilon:
+			break
+
+		# two-loop recursion, direction = -H gradient
+		q = gradient.copy()
+		a_list = []
+		for s, y in reversed(zip(s_list, y_list)):
+			a = np.sum(s * q) / np.sum(y * s)
+			q -= a * y
+			a_list.append(a)
+		if len(s_list) > 0:
+			s, y = s_list[-1], y_list[-1]
+			q *= np.sum(s * y) / np.sum(y * y)
+		for (s, y), a in zip(zip(s_list, y_list), reversed(a_list)):
+			b = np.sum(y * q) / np.sum(y * s)
+			q += (a - b) * s
+		direction = -q
+
+		# fall back to steepest descent if not a descent direction
+		slope = np.sum(direction * gradient)
+		if slope >= 0:
+			s_list, y_list = [], []
+			direction = -gradient
+			slope = -norm**2
+
+		# backtracking line search
+		step = limit_step(direction, max_move)
+		accepted = False
+		while step * np.max(np.abs(direction)) > 10**-12:
+			if max_steps is not None and count >= max_steps:
+				break
+			trial = wrap_vertices(tissue.vertices + step * direction, lx, ly)
+			trial_energy, trial_gradient = relax_potential(tissue, trial, timers)
+			count += 1
+			if trial_energy <= energy + c1 * step * slope:
+				accepted = True
+				break
+			step *= 0.5
+
+		if not accepted:
+			# no progress along L-BFGS direction, restart from gradient
+			if len(s_list) == 0:
+				break
+			s_list, y_list = [], []
+			continue
+
+		dx = step * direction
+		with timers.phase("move"):
+			displace(tissue, dx)
+
+		with timers.phase("T1"):
+			n_T1 = T1_transition_tissue(tissue, timers=timers)
+		step_count += 1
+		timers.end_step(step_count, None)
+
+		if n_T1 > 0:
+			# new topology, old curvature information is not valid
+			s_list, y_list = [], []
+			energy, gradient = relax_potential(tissue, tissue.vertices, timers)
+			count += 1
+			continue
+
+		# store correction pair if curvature is positive
+		dg = trial_gradient - gradient
+		if np.sum(dx * dg) > 10**-12:
+			s_list.append(dx)
+			y_list.append(dg)
+			if len(s_list) > m:
+				s_list.pop(0)
+				y_list.pop(0)
+
+		energy, gradient = trial_energy, trial_gradient
+
+	return count
 
 
 
@@ -0,0 +1,49 @@
+#!/usr/bin/python
+import numpy as np
+import unittest
+from parameters import get_parameters
+from force import move_vertices
+
+"""
+
+test_force.py - moving vertices with and without preallocated output
+
+usage: python test_force.py
+
+"""
+
+
+
+class MoveTest(unittest.TestCase):
+
+
+	def setUp(self):
+		np.random.seed(0)
+		self.parameters = get_parameters(5., 4., 1., 0.04, 0.12, 0.01, 0.2, 0.2, 0.05)
+		self.vertices = np.random.uniform(0., 4., (20, 2))
+		self.forces = np.random.normal(0., 10., (20, 2))
+		self.wraps = np.zeros((20, 2)).astype(int)
+
+	def test_out(self):
+		expected = move_vertices(self.vertices, self.forces, self.parameters)
+
+		buffer = np.zeros(self.vertices.shape)
+		moved = move_vertices(self.vertices, self.forces, self.parameters, out=buffer)
+		self.assertTrue(moved is buffer)
+		self.assertTrue(np.array_equal(moved, expected))
+
+		vertices = self.vertices.copy()
+		moved = move_vertices(vertices, self.forces, self.parameters, out=vertices, wraps=self.wraps)
+		self.assertTrue(moved is vertices)
+		self.assertTrue(np.array_equal(moved, expected))
+
+		# box crossings recover the unwrapped step
+		L = np.array([self.parameters['lx'], self.parameters['ly']])
+		unwrapped = self.vertices + self.parameters['delta_t'] * self.forces
+		self.assertTrue(np.allclose(moved + self.wraps * L, unwrapped))
+		self.assertTrue(np.any(self.wraps != 0))
+
+
+
+if __name__ == "__main__":
+	unittest.main()
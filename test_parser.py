@@ -0,0 +1,69 @@
+#!/usr/bin/python
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+from parser import read_cells, read_vertices, compile_network, validate_network
+
+"""
+
+test_parser.py - the network readers on valid and malformed files
+
+usage: python test_parser.py
+
+"""
+
+
+
+class ReaderTest(unittest.TestCase):
+
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def write(self, name, text):
+		file = os.path.join(self.folder, name)
+		f = open(file, "w")
+		f.write(text)
+		f.close()
+		return file
+
+	def test_valid(self):
+		vertex_file = self.write("vertices.txt", "0.\t0.\n1.\t0.\n0.\t1.\n1.\t1.\n")
+		poly_file = self.write("cells.txt", "0\t1\t3\n0\t3\t2\n")
+		vertices, n_sides, corners = compile_network(vertex_file, poly_file)
+		self.assertEqual(vertices.shape, (4, 2))
+		self.assertEqual(list(n_sides), [3, 3])
+		self.assertEqual(list(corners), [0, 1, 3, 0, 3, 2])
+
+	def test_bad_token(self):
+		file = self.write("cells.txt", "2 1 x 3\n0 1 2\n")
+		self.assertRaises(ValueError, read_cells, file)
+
+	def test_float_index(self):
+		file = self.write("cells.txt", "0 1 2\n1 2 3.5\n")
+		self.assertRaises(ValueError, read_cells, file)
+
+	def test_bad_vertex(self):
+		file = self.write("vertices.txt", "0. 0.\n1. y\n")
+		self.assertRaises(ValueError, read_vertices, file)
+		file = self.write("vertices.txt", "0. 0.\n1.\n")
+		self.assertRaises(ValueError, read_vertices, file)
+
+	def test_bad_network(self):
+		vertex_file = self.write("vertices.txt", "0. 0.\n1. 0.\n0. 1.\n")
+		poly_file = self.write("cells.txt", "0 1 3\n")
+		self.assertRaises(ValueError, compile_network, vertex_file, poly_file)
+
+		# cell sizes that do not match the indices
+		vertices = np.zeros((4, 2))
+		self.assertRaises(ValueError, validate_network, vertices, np.array([3, 3]), np.array([0, 1, 2]))
+
+
+
+if __name__ == "__main__":
+	unittest.main()
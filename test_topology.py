@@ -0,0 +1,164 @@
+#!/usr/bin/python
+import numpy as np
+import unittest
+from parameters import get_parameters
+from parser import build_tissue
+from lattice import hexagonal_lattice, perturb
+from geometry import periodic_diff
+from incidence import cell_geometry
+from neighbors import CellGraph, incidence_matrix
+from transition import set_T1, T2_transition_tissue
+
+"""
+
+test_topology.py - invariants of the half-edge topology after T1 and
+T2 transitions
+
+usage: python test_topology.py
+
+After every transition the half-edges must form closed cycles with
+consistent next / prev, twins, faces and n_sides, every vertex must
+be used, the cells must still tile the box and the neighbor graph must
+equal one built from scratch, also as the matrix built from the
+arrays.
+
+"""
+
+
+def lattice_tissue(nx=6, ny=4, seed=0):
+	np.random.seed(seed)
+	vertices, cell_indices, L = hexagonal_lattice(nx, ny)
+	vertices = perturb(vertices, L, 0.05)
+	parameters = get_parameters(L[0], L[1], 1., 0.04, 0.12, 0.01, 0.2, 0.2, 0.05, 0.01)
+	return vertices, [list(indices) for indices in cell_indices], parameters
+
+
+# replace vertex v (three cells) by a small triangle with a corner on
+# every bond of v, v itself is dropped and the rest renumbered
+def split_vertex(vertices, cell_indices, v, L, eps=0.03):
+	vertices = [np.array(x) for x in vertices]
+	corner = {}
+
+	def new_vertex(p):
+		if p not in corner:
+			d = periodic_diff(vertices[p], vertices[v], L)
+			vertices.append((vertices[v] + eps * d / np.sqrt(np.sum(d**2))) % L)
+			corner[p] = len(vertices) - 1
+		return corner[p]
+
+	for indices in cell_indices:
+		if v in indices:
+			k = indices.index(v)
+			u = indices[k-1]
+			w = indices[(k+1) % len(indices)]
+			indices[k:k+1] = [new_vertex(u), new_vertex(w)]
+
+	def angle(p):
+		d = periodic_diff(vertices[p], vertices[v], L)
+		return np.arctan2(d[1], d[0])
+	cell_indices.append([corner[p] for p in sorted(corner, key=angle)])
+
+	# drop v
+	index = np.arange(len(vertices))
+	index[v+1:] -= 1
+	cell_indices = [[int(index[i]) for i in indices] for indices in cell_indices]
+	del vertices[v]
+	return np.array(vertices), cell_indices
+
+
+
+class TopologyTest(unittest.TestCase):
+
+
+	def check_tissue(self, tissue):
+		cells = tissue.cells
+		n = len(cells.origin)
+		h = np.arange(n)
+
+		self.assertTrue(np.all(cells.next_edge[cells.prev_edge] == h))
+		self.assertTrue(np.all(cells.prev_edge[cells.next_edge] == h))
+		self.assertTrue(np.all(cells.face[cells.next_edge] == cells.face))
+
+		# twins are mutual and reversed
+		paired = h[cells.twin >= 0]
+		self.assertEqual(len(paired), n)
+		self.assertTrue(np.all(cells.twin[cells.twin[paired]] == paired))
+		self.assertTrue(np.all(cells.origin[cells.twin[paired]] == cells.dest(paired)))
+
+		# every cycle has n_sides half-edges, face_edge in its cell
+		self.assertEqual(cells.n_cells, len(cells.n_sides))
+		self.assertTrue(np.all(np.bincount(cells.face, minlength=cells.n_cells) == cells.n_sides))
+		self.assertTrue(np.all(cells.face[cells.face_edge] == np.arange(cells.n_cells)))
+		self.assertTrue(np.all(cells.n_sides >= 3))
+		cell_list = cells.cell_list()
+		self.assertEqual([len(indices) for indices in cell_list], list(cells.n_sides))
+
+		# every vertex is used and has three cells
+		self.assertTrue(np.all(np.bincount(cells.origin) == 3))
+		self.assertEqual(len(np.bincount(cells.origin)), tissue.n_vertices())
+
+		# per cell and per vertex arrays follow the compaction
+		self.assertEqual(len(tissue.A0), cells.n_cells)
+		self.assertEqual(len(tissue.theta), cells.n_cells)
+		self.assertEqual(tissue.wraps.shape, tissue.vertices.shape)
+
+		# cells tile the box
+		areas, perims = cell_geometry(tissue.vertices, cells, tissue.L)
+		self.assertAlmostEqual(np.sum(areas), tissue.L[0] * tissue.L[1])
+
+		graph = CellGraph(cell_list)
+		self.assertEqual(tissue.graph.neighbors, graph.neighbors)
+
+		# matrix from the arrays, with the same entries in the same order
+		A = incidence_matrix(cells, cells.n_cells)
+		B = graph.get_matrix()
+		self.assertTrue(np.array_equal(A.indptr, B.indptr))
+		self.assertTrue(np.array_equal(A.indices, B.indices))
+
+	def test_T1(self):
+		vertices, cell_indices, parameters = lattice_tissue()
+		tissue = build_tissue(vertices, cell_indices, parameters, 1., 0)
+		self.check_tissue(tissue)
+
+		# rewire a set of bonds with no cell in common, left and right
+		edges, valid = tissue.cells.T1_edges(tissue.cells.bond_edges())
+		edges = edges[valid]
+		used = set()
+		chosen = []
+		for k, cell_ids in enumerate(tissue.cells.T1_cells(edges)):
+			if not used & set(cell_ids):
+				used |= set(cell_ids)
+				chosen.append(k)
+		self.assertTrue(len(chosen) > 1)
+		left = np.arange(len(chosen)) % 2 == 0
+		set_T1(tissue, edges[chosen], left)
+		self.check_tissue(tissue)
+
+	def test_T2(self):
+		vertices, cell_indices, parameters = lattice_tissue()
+		L = np.array([parameters['lx'], parameters['ly']])
+		n_vertices = len(vertices)
+		n_cells = len(cell_indices)
+		n_sides = sorted(len(indices) for indices in cell_indices)
+
+		# three triangles far apart
+		for v in (0, 20, 40):
+			vertices, cell_indices = split_vertex(vertices, cell_indices, v, L)
+		tissue = build_tissue(vertices, cell_indices, parameters, 1., 0)
+		self.check_tissue(tissue)
+
+		n, keep_vertices, keep_cells = T2_transition_tissue(tissue)
+		self.assertEqual(n, 3)
+		self.assertEqual(tissue.n_vertices(), n_vertices)
+		self.assertEqual(tissue.n_cells(), n_cells)
+		self.assertEqual(sorted(tissue.cells.n_sides), n_sides)
+		self.check_tissue(tissue)
+
+		# nothing left to extrude
+		n, keep_vertices, keep_cells = T2_transition_tissue(tissue)
+		self.assertEqual(n, 0)
+
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+import time
+
+"""
+
+timing.py - per-phase timers and counters for the simulation loops
+
+	timers = Timers(enabled=True)
+	with timers.phase("forces"):
+		...
+	timers.count("T1_accepted", n)
+	timers.end_step(step, t)
+
+Every phase adds its wall time, and every counter its count, to the
+totals and to the row of the current step; end_step closes the row.
+write_csv writes one row per step, summary() a table of totals.
+
+A disabled Timers (the default) does nothing, phase() hands back a
+shared context manager that does not read the clock.
+
+"""
+
+
+class NullPhase:
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, type, value, traceback):
+		return False
+
+_null_phase = NullPhase()
+
+
+class Phase:
+
+	def __init__(self, timers, name):
+		self.timers = timers
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.time()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		self.timers.add(self.name, time.time() - self.start)
+		return False
+
+
+
+class Timers:
+
+
+	def __init__(self, enabled=False):
+		self.enabled = enabled
+		# phase and counter names in order of first use
+		self.names = []
+		self.times = {}
+		self.calls = {}
+		self.counts = {}
+		self.row = {}
+		self.rows = []
+
+	def phase(self, name):
+		if not self.enabled:
+			return _null_phase
+		return Phase(self, name)
+
+	def add(self, name, seconds):
+		if name not in self.times:
+			self.names.append(name)
+			self.times[name] = 0.
+			self.calls[name] = 0
+		self.times[name] += seconds
+		self.calls[name] += 1
+		self.row[name] = self.row.get(name, 0.) + seconds
+
+	def count(self, name, n=1):
+		if not self.enabled:
+			return
+		if name not in self.counts:
+			self.names.append(name)
+			self.counts[name] = 0
+		self.counts[name] += n
+		self.row[name] = self.row.get(name, 0) + n
+
+	# t - time of the step, None if there is none (left empty in csv)
+	def end_step(self, step, t):
+		if not self.enabled:
+			return
+		row = self.row
+		row['step'] = step
+		row['t'] = t
+		self.rows.append(row)
+		self.row = {}
+
+	def total(self):
+		return sum(self.times.values())
+
+	# table of total, per call and relative time of every phase
+	# followed by the counters
+	def summary(self):
+		lines = []
+		total = self.total()
+		lines.append("%-20s %12s %10s %12s %7s" % ("phase", "total (s)", "calls", "per call (s)", "%"))
+		for name in self.names:
+			if name in self.times:
+				seconds = self.times[name]
+				calls = self.calls[name]
+				percent = 100. * seconds / total if total > 0 else 0.
+				lines.append("%-20s %12.6f %10d %12.6f %7.2f" % (name, seconds, calls, seconds / calls, percent))
+		lines.append("%-20s %12.6f" % ("total", total))
+		for name in self.names:
+			if name in self.counts:
+				lines.append("%-20s %12d" % (name, self.counts[name]))
+		return "\n".join(lines)
+
+	# one row per step, missing phases / counters are 0
+	def write_csv(self, file):
+		f = open(file, "w")
+		f.write(",".join(["step", "t"] + self.names) + "\n")
+		for row in self.rows:
+			t = row['t'] if row['t'] is not None else ""
+			values = [row['step'], t] + [row.get(name, 0) for name in self.names]
+			f.write(",".join([str(x) for x in values]) + "\n")
+		f.close()
+		return
+
+	def write_summary(self, file):
+		f = open(file, "w")
+		f.write(self.summary() + "\n")
+		f.close()
+		return
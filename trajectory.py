@@ -0,0 +1,188 @@
+#!/usr/bin/python
+import numpy as np
+import os
+
+"""
+
+trajectory.py - binary trajectory of a Tissue
+
+A trajectory is a folder with
+
+index.npz - 	one entry per frame, rewritten every time a chunk
+				is saved
+				* steps, times - step number and time of every frame
+				* chunk - chunk file holding the frame
+				* topology - topology file of the frame
+				* L - box lengths
+
+frames_%05d.npz - chunk of consecutive frames
+				* vertices, wraps - (n_frames, n_vertices, 2) arrays
+
+topology_%05d.npz - cells in CSR form (n_sides, corners), only written
+				when T1 transitions (or anything else) changed them
+
+Vertex positions are written every `every` steps and kept in memory
+until chunk_size frames are collected. The reader loads the index once
+and any frame with at most two small file reads.
+
+"""
+
+
+class TrajectoryWriter:
+
+
+	# folder - created if it does not exist
+	# every - write every N-th step
+	# chunk_size - frames per chunk file
+	def __init__(self, folder, L, every=1, chunk_size=100):
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		self.folder = folder
+		self.L = np.array(L).astype(float)
+		self.every = every
+		self.chunk_size = chunk_size
+
+		# index of frames already saved
+		self.steps = []
+		self.times = []
+		self.chunk = []
+		self.topology = []
+
+		# frames of the current chunk
+		self.vertices = []
+		self.wraps = []
+		self.n_chunks = 0
+
+		self.n_topologies = 0
+		self.n_sides = None
+		self.corners = None
+
+	# add tissue configuration at step, time t
+	def write(self, tissue, step, t):
+		if step % self.every != 0:
+			return
+
+		# vertex count changed, start a new chunk
+		if len(self.vertices) > 0 and len(self.vertices[-1]) != tissue.n_vertices():
+			self.flush()
+
+		self.write_topology(tissue)
+
+		self.steps.append(step)
+		self.times.append(t)
+		self.chunk.append(self.n_chunks)
+		self.topology.append(self.n_topologies - 1)
+		self.vertices.append(tissue.vertices.copy())
+		self.wraps.append(tissue.wraps.copy())
+
+		if len(self.vertices) >= self.chunk_size:
+			self.flush()
+		return
+
+	# save topology if it differs from the last one saved
+	def write_topology(self, tissue):
+		inc = tissue.cells.to_incidence()
+		if self.n_sides is not None and np.array_equal(inc.n_sides, self.n_sides) \
+			and np.array_equal(inc.corners, self.corners):
+			return
+
+		self.n_sides = inc.n_sides
+		self.corners = inc.corners
+		file = os.path.join(self.folder, "topology_%05d.npz" % self.n_topologies)
+		save_npz(file, n_sides=inc.n_sides, corners=inc.corners)
+		self.n_topologies += 1
+		return
+
+	# save current chunk and index
+	def flush(self):
+		if len(self.vertices) == 0:
+			return
+		file = os.path.join(self.folder, "frames_%05d.npz" % self.n_chunks)
+		save_npz(file, vertices=np.array(self.vertices), wraps=np.array(self.wraps))
+		self.vertices = []
+		self.wraps = []
+		self.n_chunks += 1
+
+		file = os.path.join(self.folder, "index.npz")
+		save_npz(file, steps=np.array(self.steps), times=np.array(self.times),
+			chunk=np.array(self.chunk), topology=np.array(self.topology), L=self.L)
+		return
+
+	def close(self):
+		self.flush()
+		return
+
+
+
+class TrajectoryReader:
+
+
+	def __init__(self, folder):
+		self.folder = folder
+		with np.load(os.path.join(folder, "index.npz")) as index:
+			self.steps = index['steps']
+			self.times = index['times']
+			self.chunk = index['chunk']
+			self.topology = index['topology']
+			self.L = index['L']
+
+		# first frame of every chunk
+		self.chunk_start = np.searchsorted(self.chunk, np.arange(self.chunk[-1] + 1)) \
+			if len(self.chunk) > 0 else np.zeros(0).astype(int)
+
+		# last chunk and topology loaded
+		self.cache = {}
+
+	def n_frames(self):
+		return len(self.steps)
+
+	def load(self, name, i):
+		key = (name, i)
+		if key not in self.cache:
+			# keep a single file of each kind
+			for k in list(self.cache.keys()):
+				if k[0] == name:
+					del self.cache[k]
+			file = os.path.join(self.folder, "%s_%05d.npz" % (name, i))
+			with np.load(file) as data:
+				self.cache[key] = dict((k, data[k]) for k in data.files)
+		return self.cache[key]
+
+	# vertices and box crossings of frame k
+	def get_vertices(self, k):
+		c = self.chunk[k]
+		data = self.load("frames", c)
+		pos = k - self.chunk_start[c]
+		return data['vertices'][pos], data['wraps'][pos]
+
+	# n_sides and corners of frame k
+	def get_topology(self, k):
+		data = self.load("topology", self.topology[k])
+		return data['n_sides'], data['corners']
+
+	# list of vertex indices for every cell of frame k
+	def get_cells(self, k):
+		n_sides, corners = self.get_topology(k)
+		return np.split(corners, np.cumsum(n_sides)[:-1])
+
+	# vertices, list of cells and time of frame k
+	def get_frame(self, k):
+		vertices, wraps = self.get_vertices(k)
+		return vertices, self.get_cells(k), self.times[k]
+
+	# positions without periodic wrapping, e.g. for MSD
+	def get_unwrapped(self, k):
+		vertices, wraps = self.get_vertices(k)
+		return vertices + wraps * self.L
+
+
+
+# write arrays to file through a temporary file, so that an interrupted
+# run never leaves a partially written file behind
+def save_npz(file, **arrays):
+	tmp = file + ".tmp"
+	f = open(tmp, "wb")
+	np.savez(f, **arrays)
+	f.close()
+	os.rename(tmp, file)
+	return
@@ -1,14 +1,17 @@
 #!/usr/bin/python
 import numpy as np 
-from Polygon import Polygon
+from Polygon import Polygon, bump_version
 from geometry import periodic_diff
 from energy import *
+from incidence import cell_geometry, edge_vectors
+from neighbors import CellGraph
 import copy
 
 
 """ 
 
 transition.py - implements T1 transition for short bond lengths
+and T2 transition (extrusion) for small triangular cells
 
 author: Lexi Signoriello
 date: 2/12/16
@@ -377,7 +380,8 @@ def get_4_polys(polys, i1, i2):
 	
 
 
-def T1_transition(vertices, polys, edges, parameters):
+# graph - optional neighbors.CellGraph, updated for rewired cells
+def T1_transition(vertices, polys, edges, parameters, graph=None):
 	
 
 	lx = parameters['lx']
@@ -437,6 +441,9 @@ def T1_transition(vertices, polys, edges, parameters):
 				if min_i == 2:
 					set_T1_right(polys, polys_r, poly_ids, edges, indices)
 
+				if min_i != 0 and graph is not None:
+					graph.update(dict((c, polys[c].indices) for c in poly_ids))
+
 	return polys, edges
 
 
@@ -468,6 +475,8 @@ def set_T1_left(polys, polys_l, poly_ids, edges, indices):
 		if edge[0] == i5 and edge[1] == i2:
 			edges[i][1] = i1
 	
+	# geometry of rewired cells is out of date
+	bump_version()
 	return 
 
 
@@ -502,29 +511,286 @@ def set_T1_right(polys, polys_r, poly_ids, edges, indices):
 		if edge[0] == i6 and edge[1] == i2:
 			edges[i][1] = i1
 
+	# geometry of rewired cells is out of date
+	bump_version()
 	return 
 
 
 
 
-def T2_transition(network, vertices, polys, edges, min_area):
-	pass
-
-
-
-
-
-
-
-
-
-
-
-
-
+# T1 transitions for a Tissue
+# same procedure as T1_transition on the half-edge topology of the
+# tissue: the 4 cells and 6 vertices around a bond are half-edge
+# lookups and the rewiring is a constant number of array writes,
+# see halfedge.py for the half-edge labels
+
+
+# Energy change of the left and right transitions
+# computed from the positions of i1 - i6 only: every rewiring removes
+# or inserts a single vertex in each of the 4 cells, which changes the
+# cell area by one triangle and the perimeter by two or three bonds
+#
+# evaluated for many candidates at once
+# cell_ids - (n,4) array of cells 0 - 3 for every candidate
+# indices - (n,6) array of i1 - i6 for every candidate
+# areas - signed areas of all cells, perims - perimeters of all cells
+# returns dE_left, dE_right (n,) and the (n,4) (area, perimeter) changes
+def T1_delta_energy(tissue, cell_ids, indices, areas, perims):
+	# vertices i1 - i6 unwrapped with respect to i1
+	vertices = tissue.vertices
+	v1 = vertices[indices[:,0]][:,None,:]
+	p = v1 + periodic_diff(vertices[indices], v1, tissue.L)
+	p1,p2,p3,p4,p5,p6 = [p[:,k,:] for k in range(6)]
+
+	# signed area of triangles a, b, c
+	def tri(a, b, c):
+		return 0.5 * ((b[:,0] - a[:,0]) * (c[:,1] - a[:,1]) - (c[:,0] - a[:,0]) * (b[:,1] - a[:,1]))
+
+	def l(a, b):
+		return np.sqrt(np.sum((a - b)**2, axis=1))
+
+	# left
+	# Cell 0: remove i2 between i1, i5
+	# Cell 1: insert i2 between i3, i1
+	# Cell 2: remove i1 between i2, i3
+	# Cell 3: insert i1 between i5, i2
+	dA_l = np.column_stack((-tri(p1,p2,p5), tri(p3,p2,p1), -tri(p2,p1,p3), tri(p5,p1,p2)))
+	dP_l = np.column_stack((l(p1,p5) - l(p1,p2) - l(p2,p5),
+		l(p3,p2) + l(p2,p1) - l(p3,p1),
+		l(p2,p3) - l(p2,p1) - l(p1,p3),
+		l(p5,p1) + l(p1,p2) - l(p5,p2)))
+	# i1 - i3, i2 - i5 become i2 - i3, i1 - i5
+	dL_l = l(p2,p3) + l(p1,p5) - l(p1,p3) - l(p2,p5)
+
+	# right
+	# Cell 0: remove i1 between i4, i2
+	# Cell 1: insert i2 between i1, i4
+	# Cell 2: remove i2 between i6, i1
+	# Cell 3: insert i1 between i2, i6
+	dA_r = np.column_stack((-tri(p4,p1,p2), tri(p1,p2,p4), -tri(p6,p2,p1), tri(p2,p1,p6)))
+	dP_r = np.column_stack((l(p4,p2) - l(p4,p1) - l(p1,p2),
+		l(p1,p2) + l(p2,p4) - l(p1,p4),
+		l(p6,p1) - l(p6,p2) - l(p2,p1),
+		l(p2,p1) + l(p1,p6) - l(p2,p6)))
+	# i1 - i4, i2 - i6 become i2 - i4, i1 - i6
+	dL_r = l(p2,p4) + l(p1,p6) - l(p1,p4) - l(p2,p6)
+
+	A = areas[cell_ids]
+	P = perims[cell_ids]
+	A0 = tissue.A0[cell_ids]
+	ka = tissue.ka[cell_ids]
+	gamma = tissue.gamma
+	Lambda = tissue.Lambda
+
+	def cells_energy(A, P):
+		return np.sum((ka / 2.) * (np.abs(A) - A0)**2 + (gamma / 2.) * P**2, axis=1)
+
+	E0 = cells_energy(A, P)
+	# bonds are stored in both directions in edges,
+	# take into account double counting edges as get_energy
+	dE_l = cells_energy(A + dA_l, P + dP_l) - E0 + Lambda * dL_l / 2.
+	dE_r = cells_energy(A + dA_r, P + dP_r) - E0 + Lambda * dL_r / 2.
+
+	return dE_l, dE_r, (dA_l, dP_l), (dA_r, dP_r)
+
+
+# returns the number of transitions applied
+# timers - optional timing.Timers, counts short bonds (T1_candidates)
+# and transitions (T1_accepted)
+def T1_transition_tissue(tissue, batched=False, timers=None):
+	if batched:
+		return T1_transition_batch(tissue, timers)
+
+	vertices = tissue.vertices
+	cells = tissue.cells
+	L = tissue.L
+	lmin = tissue.lmin
+
+	# short bonds from a single pass over all bond lengths
+	bonds = cells.bond_edges()
+	d, lengths = edge_vectors(vertices, tissue.bonds(), L)
+	short = bonds[lengths < lmin]
+	if timers is not None:
+		timers.count("T1_candidates", len(short))
+	if len(short) == 0:
+		return 0
+
+	# current geometry, updated as transitions are applied
+	areas, perims = cell_geometry(vertices, cells, L, signed=True)
+
+	count = 0
+	for h in short:
+		# bond may have been rewired by a previous transition
+		i1 = cells.origin[h]
+		i2 = cells.dest(h)
+		v1 = vertices[i1]
+		v2 = v1 + periodic_diff(vertices[i2], v1, L)
+		dist = euclidean_distance(v1[0], v1[1], v2[0], v2[1])
 
+		if dist < lmin:
+			edges, valid = cells.T1_edges([h])
+			if not valid[0]:
+				continue
 
+			cell_ids = cells.T1_cells(edges)
+			indices = cells.T1_indices(edges)
 
+			# energy of left and right transitions relative to original
+			dE_l, dE_r, change_l, change_r = T1_delta_energy(tissue, cell_ids, indices, areas, perims)
 
+			min_i = np.argmin((0., dE_l[0], dE_r[0]))
 
+			if min_i == 1:
+				set_T1(tissue, edges, [True])
+				dA, dP = change_l
 
+			if min_i == 2:
+				set_T1(tissue, edges, [False])
+				dA, dP = change_r
+
+			if min_i != 0:
+				areas[cell_ids[0]] += dA[0]
+				perims[cell_ids[0]] += dP[0]
+				count += 1
+
+	if timers is not None:
+		timers.count("T1_accepted", count)
+	return count
+
+
+# rewire cells around T1 edges and update the neighbor graph
+# edges - (n,10) array from HalfEdges.T1_edges, no shared cells
+# left - left or right transition for every row
+def set_T1(tissue, edges, left):
+	cell_ids = tissue.cells.T1_cells(edges)
+	tissue.cells.T1_rewire(edges, left)
+
+	changed = np.unique(cell_ids)
+	tissue.graph.update(dict((c, tissue.get_cell(c)) for c in changed))
+	return
+
+
+
+
+# Batched T1 transitions
+# returns the number of transitions applied
+# all short bonds are gathered and scored together, then a set of
+# transitions with no cell in common is applied in one pass
+# transitions touching a cell already rewired are left for the next step
+
+
+def T1_transition_batch(tissue, timers=None):
+	vertices = tissue.vertices
+	cells = tissue.cells
+	L = tissue.L
+	lmin = tissue.lmin
+
+	# short bonds from a single pass over all bond lengths
+	bonds = cells.bond_edges()
+	d, lengths = edge_vectors(vertices, tissue.bonds(), L)
+	short = bonds[lengths < lmin]
+	if timers is not None:
+		timers.count("T1_candidates", len(short))
+	if len(short) == 0:
+		return 0
+
+	edges, valid = cells.T1_edges(short)
+	edges = edges[valid]
+	if len(edges) == 0:
+		return 0
+	cell_ids = cells.T1_cells(edges)
+	indices = cells.T1_indices(edges)
+
+	# score original, left and right for every candidate
+	areas, perims = cell_geometry(vertices, cells, L, signed=True)
+	dE_l, dE_r, change_l, change_r = T1_delta_energy(tissue, cell_ids, indices, areas, perims)
+	dE = np.column_stack((np.zeros(len(dE_l)), dE_l, dE_r))
+	min_i = np.argmin(dE, axis=1)
+
+	# candidates that lower the energy, best first
+	move = np.where(min_i != 0)[0]
+	move = move[np.argsort(np.min(dE[move], axis=1))]
+
+	# keep candidates ranked first in all of their 4 cells
+	rank = np.arange(len(move))
+	owner = np.zeros(tissue.n_cells()).astype(int)
+	owner.fill(len(move))
+	np.minimum.at(owner, cell_ids[move].ravel(), np.repeat(rank, 4))
+	keep = move[np.all(owner[cell_ids[move]] == rank[:,None], axis=1)]
+	if timers is not None:
+		timers.count("T1_accepted", len(keep))
+	if len(keep) == 0:
+		return 0
+
+	# apply all rewirings
+	set_T1(tissue, edges[keep], min_i[keep] == 1)
+	return len(keep)
+
+
+
+
+# T2 transitions
+# triangles with area below tissue.amin are extruded, their three
+# vertices merged into one at the triangle's center
+# small cells with more sides first lose them through T1 transitions
+# as their bonds get shorter than lmin
+# all small cells are found from one area array, triangles with no
+# cell in common are removed together (smallest first) by compacting
+# the vertex and cell arrays, the others are left for the next step
+
+
+# returns the number of transitions applied, and kept vertices and
+# cells (old indices in new order, see HalfEdges.T2_remove)
+# timers - optional timing.Timers, counts small triangles
+# (T2_candidates) and transitions (T2_accepted)
+def T2_transition_tissue(tissue, timers=None):
+	cells = tissue.cells
+	n_vertices = tissue.n_vertices()
+	keep_vertices = np.arange(n_vertices)
+	keep_cells = np.arange(tissue.n_cells())
+
+	areas, perims = cell_geometry(tissue.vertices, cells, tissue.L)
+	small = np.where((areas < tissue.amin) & (cells.n_sides == 3))[0]
+	if timers is not None:
+		timers.count("T2_candidates", len(small))
+	if len(small) == 0:
+		return 0, keep_vertices, keep_cells
+
+	edges, valid = cells.T2_edges(small)
+	edges = edges[valid]
+	small = small[valid]
+
+	# keep triangles ranked first in all of their 4 cells
+	order = np.argsort(areas[small])
+	edges = edges[order]
+	rank = np.arange(len(edges))
+	cell_ids = cells.T2_cells(edges)
+	owner = np.zeros(tissue.n_cells()).astype(int)
+	owner.fill(len(edges))
+	np.minimum.at(owner, cell_ids.ravel(), np.repeat(rank, 4))
+	edges = edges[np.all(owner[cell_ids] == rank[:,None], axis=1)]
+	if timers is not None:
+		timers.count("T2_accepted", len(edges))
+	if len(edges) == 0:
+		return 0, keep_vertices, keep_cells
+
+	# merged vertex at the center of a, b, c, wrapped into the box
+	a, b, c = [cells.origin[edges[:,k]] for k in range(3)]
+	vertices = tissue.vertices
+	L = tissue.L
+	va = vertices[a]
+	center = va + (periodic_diff(vertices[b], va, L) + periodic_diff(vertices[c], va, L)) / 3.
+	shift = np.floor(center / L)
+	vertices[a] = center - shift * L
+	tissue.wraps[a] += shift.astype(int)
+
+	keep_vertices, keep_cells = cells.T2_remove(edges, n_vertices)
+	tissue.vertices = vertices[keep_vertices]
+	tissue.wraps = tissue.wraps[keep_vertices]
+	tissue.A0 = tissue.A0[keep_cells]
+	tissue.ka = tissue.ka[keep_cells]
+	tissue.theta = tissue.theta[keep_cells]
+
+	# cells and vertices are renumbered, so the graph is built again
+	tissue.graph = CellGraph(cells.cell_list())
+	return len(edges), keep_vertices, keep_cells